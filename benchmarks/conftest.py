@@ -0,0 +1,2 @@
+def pytest_addoption(parser):
+    parser.addoption("--long-records", action="store_true", help="Also benchmark 1 h and 24 h Holter-length records")
@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["numpy", "pandas", "plotly", "gspread", "google.oauth2", "streamlit_agraph", "pyarrow"]
+ROUTES = ["landing", "guest", "admin"]
+
+# Runs in a fresh interpreter so every measurement is a cold start. AppTest and its own
+# imports are loaded before the clock starts; only the app script's imports are timed.
+PROBE = """
+import json, os, sys, time
+from streamlit.testing.v1 import AppTest
+
+route = sys.argv[1]
+heavy = json.loads(sys.argv[2])
+before = {m for m in heavy if m in sys.modules}
+at = AppTest.from_file(os.path.join("ecg_annot", "launch.py"), default_timeout=60)
+if route != "landing":
+    at.session_state["role"] = route
+start = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "route": route,
+    "first_run_s": elapsed,
+    "loaded": [m for m in heavy if m in sys.modules and m not in before],
+    "exception": [e.message for e in at.exception],
+}))
+"""
+
+
+def probe(route, env):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, route, json.dumps(HEAVY_MODULES)],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of each route and the heavy modules it imports.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    # The admin route opens the response and state databases, so point them at a throwaway directory.
+    state_dir = tempfile.TemporaryDirectory(prefix="ecg_annot_import_")
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+        ECG_ANNOT_RESPONSE_BACKEND="sqlite",
+        ECG_ANNOT_RESPONSES_DB=os.path.join(state_dir.name, "responses.db"),
+        ECG_ANNOT_STATE_DIR=state_dir.name,
+    )
+    report = []
+    with state_dir:
+        for route in ROUTES:
+            runs = [probe(route, env) for _ in range(args.repeat)]
+            report.append({
+                "route": route,
+                "median_first_run_s": statistics.median(r["first_run_s"] for r in runs),
+                "loaded": runs[0]["loaded"],
+                "exception": runs[0]["exception"],
+            })
+
+    print(f"{'route':<10}{'first run s':>12}  heavy modules imported")
+    for row in report:
+        print(f"{row['route']:<10}{row['median_first_run_s']:>12.3f}  {', '.join(row['loaded']) or '-'}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
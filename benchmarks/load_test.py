@@ -0,0 +1,257 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+# The app reads its backend from the environment at import time, so point it at a local
+# SQLite stand-in for the sheet and a throwaway state directory before any ecg_annot module
+# is imported. The environment's backend is only used with --allow-sheets, which has to be
+# checked before argparse runs.
+_STATE_DIR = tempfile.mkdtemp(prefix="ecg_annot_bench_")
+ALLOW_SHEETS = "--allow-sheets" in sys.argv[1:]
+_BENCH_ENV = {
+    "ECG_ANNOT_RESPONSE_BACKEND": "sqlite",
+    "ECG_ANNOT_RESPONSES_DB": os.path.join(_STATE_DIR, "responses.db"),
+    "ECG_ANNOT_STATE_DIR": _STATE_DIR,
+}
+if ALLOW_SHEETS:
+    for name, value in _BENCH_ENV.items():
+        os.environ.setdefault(name, value)
+else:
+    os.environ.update(_BENCH_ENV)
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from ecg_annot.configs.annotation import ALL_QUESTIONS_GRAPH
+from ecg_annot.data_utils.records import ECGRecord
+from ecg_annot.flow import current_question_key
+from ecg_annot.server.array_store import content_key, shared_array_store
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAUNCH_PATH = os.path.join(REPO_ROOT, "ecg_annot", "launch.py")
+DEFAULT_RECORDS = sorted(glob.glob(os.path.join(REPO_ROOT, "data", "batch_*.xml")))
+
+
+def pick_answer(question_key, rng):
+    question = ALL_QUESTIONS_GRAPH[question_key]
+    choices = question["choices"]
+    if not question.get("multilabel"):
+        return rng.choice(choices)
+    if question_key == "Noise artifacts":
+        return ["None"] if rng.random() < 0.7 else [rng.choice(choices[:-1])]
+    return rng.sample(choices, rng.randint(1, 2))
+
+
+def click(at, label):
+    next(b for b in at.button if b.label == label).click().run()
+
+
+def flow_state(at):
+    return {k: at.session_state[k] for k in ("current_question_index", "answers", "navigation_history", "show_review")}
+
+
+def open_record(at, path):
+    with open(path, "rb") as f:
+        file_bytes = f.read()
+    key = content_key(file_bytes)
+    shared_array_store().acquire(key, at.session_state["session_id"], lambda: ECGRecord.from_xml_path(path))
+    at.session_state["record_key"] = key
+    at.session_state["file_type"] = "signal"
+    at.session_state["current_filename"] = os.path.basename(path)
+    at.session_state["file_uploaded"] = True
+    at.session_state["navigation_history"] = ["Noise artifacts"]
+    at.run()
+
+
+def apptest_annotator(idx, records, n_records, timeout, timings):
+    rng = random.Random(idx)
+    at = AppTest.from_file(LAUNCH_PATH, default_timeout=timeout)
+    at.run()
+    click(at, "Guest")
+    yield
+    for r in range(n_records):
+        start = time.perf_counter()
+        open_record(at, records[(idx + r) % len(records)])
+        timings["upload_to_plot"].append(time.perf_counter() - start)
+        yield
+        while not at.session_state["show_review"]:
+            question_key = current_question_key(flow_state(at))
+            answer = pick_answer(question_key, rng)
+            widget = at.multiselect if ALL_QUESTIONS_GRAPH[question_key].get("multilabel") else at.radio
+            widget(key=f"answer_{question_key}").set_value(answer)
+            start = time.perf_counter()
+            click(at, "Next")
+            timings["question_rerun"].append(time.perf_counter() - start)
+            yield
+        start = time.perf_counter()
+        click(at, "Submit")
+        timings["submit"].append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        click(at, "Upload Another File")
+        yield
+
+
+def run_apptest(records, n_annotators, n_records, timeout):
+    # AppTest drives a process-global runtime and cannot run from several threads, so the
+    # simulated annotators keep their sessions open side by side and take turns per step.
+    timings = defaultdict(list)
+    annotators = [apptest_annotator(i, records, n_records, timeout, timings) for i in range(n_annotators)]
+    while annotators:
+        for annotator in annotators[:]:
+            try:
+                next(annotator)
+            except StopIteration:
+                annotators.remove(annotator)
+    return [timings]
+
+
+def measure_session_memory(records, n_sessions, timeout):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sessions = []
+    for i in range(n_sessions):
+        at = AppTest.from_file(LAUNCH_PATH, default_timeout=timeout)
+        at.run()
+        click(at, "Guest")
+        open_record(at, records[i % len(records)])
+        sessions.append(at)
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used / n_sessions
+
+
+async def run_api_annotator(client, base_url, idx, filenames, n_records):
+    rng = random.Random(idx)
+    timings = defaultdict(list)
+
+    async def call(method, path, body=None):
+        response = await client.fetch(f"{base_url}{path}", method=method, body=None if body is None else json.dumps(body))
+        return json.loads(response.body)
+
+    for r in range(n_records):
+        start = time.perf_counter()
+        session = await call("POST", "/sessions", {"user_id": f"annotator-{idx}", "filename": filenames[(idx + r) % len(filenames)]})
+        await call("GET", f"/sessions/{session['session_id']}/signal")
+        timings["upload_to_plot"].append(time.perf_counter() - start)
+        question = session["question"]
+        while question is not None:
+            body = {"key": question["key"], "answer": pick_answer(question["key"], rng)}
+            start = time.perf_counter()
+            question = (await call("POST", f"/sessions/{session['session_id']}/answer", body))["question"]
+            timings["question_rerun"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        await call("POST", f"/sessions/{session['session_id']}/submit", {})
+        timings["submit"].append(time.perf_counter() - start)
+    return timings
+
+
+def start_api_server(corpus_dir):
+    import tornado.httpserver
+    import tornado.testing
+
+    from ecg_annot.server.api import make_app, make_service
+
+    sock, port = tornado.testing.bind_unused_port()
+    ready = threading.Event()
+
+    def serve():
+        async def main():
+            server = tornado.httpserver.HTTPServer(make_app(make_service(corpus_dir)))
+            server.add_sockets([sock])
+            ready.set()
+            await asyncio.Event().wait()
+
+        asyncio.run(main())
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{port}"
+
+
+def run_api(records, concurrency, n_records):
+    from tornado.httpclient import AsyncHTTPClient
+
+    corpus_dirs = {os.path.dirname(p) for p in records}
+    if len(corpus_dirs) != 1:
+        raise ValueError("API mode expects all records in one directory")
+    base_url = start_api_server(corpus_dirs.pop())
+    filenames = [os.path.basename(p) for p in records]
+
+    async def main():
+        client = AsyncHTTPClient(max_clients=concurrency)
+        return await asyncio.gather(*[run_api_annotator(client, base_url, i, filenames, n_records) for i in range(concurrency)])
+
+    return asyncio.run(main())
+
+
+def summarize(results):
+    merged = defaultdict(list)
+    for timings in results:
+        for name, values in timings.items():
+            merged[name].extend(values)
+    summary = {}
+    for name, values in merged.items():
+        ms = np.asarray(values) * 1000
+        summary[name] = {
+            "n": len(ms),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent annotators and report latency percentiles.")
+    parser.add_argument("--mode", choices=["apptest", "api"], default="apptest")
+    parser.add_argument("--annotators", type=int, default=4)
+    parser.add_argument("--records", type=int, default=2, help="Records annotated per annotator")
+    parser.add_argument("--files", nargs="*", default=DEFAULT_RECORDS)
+    parser.add_argument("--memory-sessions", type=int, default=10, help="Sessions held open for the memory measurement (0 to skip)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    parser.add_argument(
+        "--allow-sheets",
+        action="store_true",
+        help="Use the response backend and state directory from the environment instead of a temporary SQLite copy",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.mode == "apptest":
+        results = run_apptest(args.files, args.annotators, args.records, args.timeout)
+    else:
+        results = run_api(args.files, args.annotators, args.records)
+    report = {
+        "mode": args.mode,
+        "annotators": args.annotators,
+        "records_per_annotator": args.records,
+        "wall_s": time.perf_counter() - start,
+        "latency": summarize(results),
+    }
+    if args.mode == "apptest" and args.memory_sessions:
+        report["memory_per_session_bytes"] = measure_session_memory(args.files, args.memory_sessions, args.timeout)
+        report["array_store"] = shared_array_store().stats()
+
+    print(f"{'phase':<16}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in report["latency"].items():
+        print(f"{name:<16}{row['n']:>6}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    if "memory_per_session_bytes" in report:
+        print(f"memory per session: {report['memory_per_session_bytes'] / 1024:.1f} KiB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
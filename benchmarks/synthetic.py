@@ -0,0 +1,56 @@
+import base64
+
+import numpy as np
+
+EIGHT_LEADS = ["I", "II", "V1", "V2", "V3", "V4", "V5", "V6"]
+TWELVE_LEADS = ["I", "II", "III", "aVR", "aVL", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+# Spellings seen in other device exports; only the type2 decoder canonicalizes these.
+VENDOR_LEAD_IDS = {"I": "1", "II": "2", "III": "3", "aVR": "AVR", "aVL": "avl", "aVF": "AV-F", "V1": "V01", "V2": "V02"}
+
+LEAD_TEMPLATE = """      <LeadData>
+         <LeadByteCountTotal>{nbytes}</LeadByteCountTotal>
+         <LeadSampleCountTotal>{n_samples}</LeadSampleCountTotal>
+         <LeadAmplitudeUnitsPerBit>{units_per_bit}</LeadAmplitudeUnitsPerBit>
+         <LeadAmplitudeUnits>MICROVOLTS</LeadAmplitudeUnits>
+         <LeadID>{lead_id}</LeadID>
+         <LeadSampleSize>2</LeadSampleSize>
+         <WaveFormData>
+{data}
+         </WaveFormData>
+      </LeadData>
+"""
+
+
+def synthetic_lead(n_samples: int, fs: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples, dtype=np.float32) / fs
+    beat = np.exp(-(((t % 0.8) - 0.3) ** 2) / 0.0004) * 1000
+    return (beat + rng.normal(0, 20, n_samples)).astype(np.int16)
+
+
+def _wrap(b64: str, width: int = 68) -> str:
+    return "\n".join(b64[i : i + width] for i in range(0, len(b64), width))
+
+
+def write_muse_xml(path, seconds: float, fs: int = 500, leads=EIGHT_LEADS, waveform_types=("Rhythm",), vendor_ids: bool = False):
+    n_samples = int(seconds * fs)
+    with open(path, "w", encoding="ascii") as f:
+        f.write('<!DOCTYPE RestingECG SYSTEM "restecg.dtd">\n<RestingECG>\n')
+        for wf_type in waveform_types:
+            wf_samples = n_samples if wf_type == "Rhythm" else min(n_samples, 600)
+            f.write(f"   <Waveform>\n      <WaveformType>{wf_type}</WaveformType>\n      <SampleBase>{fs}</SampleBase>\n")
+            f.write(f"      <NumberofLeads>{len(leads)}</NumberofLeads>\n")
+            for i, lead in enumerate(leads):
+                data = synthetic_lead(wf_samples, fs, seed=i).tobytes()
+                f.write(
+                    LEAD_TEMPLATE.format(
+                        nbytes=len(data),
+                        n_samples=wf_samples,
+                        units_per_bit=4.88,
+                        lead_id=VENDOR_LEAD_IDS.get(lead, lead) if vendor_ids else lead,
+                        data=_wrap(base64.b64encode(data).decode("ascii")),
+                    )
+                )
+            f.write("   </Waveform>\n")
+        f.write("</RestingECG>\n")
+    return path
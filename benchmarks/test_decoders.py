@@ -0,0 +1,112 @@
+import base64
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import EIGHT_LEADS, TWELVE_LEADS, synthetic_lead, write_muse_xml
+from ecg_annot.data_utils import prepare_xml
+from ecg_annot.data_utils.prepare_np import load_ecg_signals_only as load_ecg_np
+from ecg_annot.data_utils.records import ECGRecord
+
+SHORT_DURATIONS = {"10s": 10, "60s": 60, "10min": 600}
+LONG_DURATIONS = {"1h": 3600, "24h": 24 * 3600}
+HOLTER_FS = 250
+
+CASES = {
+    "8lead-derived": {"leads": EIGHT_LEADS},
+    "12lead": {"leads": TWELVE_LEADS},
+    "rhythm+median": {"leads": EIGHT_LEADS, "waveform_types": ("Median", "Rhythm")},
+    "vendor-ids": {"leads": TWELVE_LEADS, "vendor_ids": True},
+}
+
+
+def durations(config):
+    found = dict(SHORT_DURATIONS)
+    if config.getoption("--long-records"):
+        found.update(LONG_DURATIONS)
+    return found
+
+
+def pytest_generate_tests(metafunc):
+    if "duration" in metafunc.fixturenames:
+        found = durations(metafunc.config)
+        metafunc.parametrize("duration", list(found.values()), ids=list(found.keys()), scope="module")
+
+
+def record_memory(benchmark, fn, *args):
+    tracemalloc.start()
+    result = fn(*args)
+    retained = tracemalloc.take_snapshot().statistics("filename")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    benchmark.extra_info["peak_bytes"] = peak
+    benchmark.extra_info["retained_bytes"] = sum(s.size for s in retained)
+    benchmark.extra_info["retained_blocks"] = sum(s.count for s in retained)
+    return result
+
+
+@pytest.fixture(scope="module", params=list(CASES), ids=list(CASES))
+def xml_record(request, duration, tmp_path_factory):
+    fs = HOLTER_FS if duration > 600 else 500
+    path = tmp_path_factory.mktemp("xml") / f"{request.param}-{duration}s.xml"
+    write_muse_xml(path, duration, fs=fs, **CASES[request.param])
+    return str(path), request.param
+
+
+def test_load_xml(benchmark, xml_record):
+    path, _ = xml_record
+    signals = record_memory(benchmark, prepare_xml.load_ecg_signals_only, path)
+    assert signals.shape[0] == len(prepare_xml.PTB_ORDER)
+    benchmark.pedantic(prepare_xml.load_ecg_signals_only, args=(path,), rounds=3, iterations=1)
+
+
+def test_index_xml(benchmark, xml_record):
+    path, _ = xml_record
+    root = ET.parse(path).getroot()
+    record_memory(benchmark, prepare_xml.index_ecg_xml, root, path)
+    benchmark.pedantic(prepare_xml.index_ecg_xml, args=(root, path), rounds=3, iterations=1)
+
+
+def test_decode_waveform(benchmark, duration):
+    b64 = base64.b64encode(synthetic_lead(duration * 500, 500, seed=0).tobytes()).decode("ascii")
+    record_memory(benchmark, prepare_xml._decode_waveform_raw, b64)
+    benchmark(prepare_xml._decode_waveform_raw, b64)
+
+
+def test_assemble_derived_leads(benchmark, duration):
+    leads = {lead: synthetic_lead(duration * 500, 500, seed=i).astype(np.float32) for i, lead in enumerate(EIGHT_LEADS)}
+    record_memory(benchmark, prepare_xml.assemble_leads, prepare_xml.PTB_ORDER, leads.get)
+    benchmark(prepare_xml.assemble_leads, prepare_xml.PTB_ORDER, leads.get)
+
+
+def test_canon_lead_id(benchmark):
+    ids = ["I", "ii", "3", "AVR", "avl", "aV-F", "V01", "v6", " V 2 ", "Lead X"]
+    benchmark(lambda: [prepare_xml._canon_lead_id(i) for i in ids])
+
+
+@pytest.mark.parametrize("layout", ["leads-first", "time-first"])
+def test_load_npy(benchmark, duration, layout, tmp_path):
+    arr = np.random.default_rng(0).normal(size=(12, duration * 500)).astype(np.float64)
+    path = tmp_path / "record.npy"
+    np.save(path, arr if layout == "leads-first" else arr.T)
+    record_memory(benchmark, load_ecg_np, str(path))
+    benchmark(load_ecg_np, str(path))
+
+
+def test_load_xml_record(benchmark, xml_record):
+    path, _ = xml_record
+    record = record_memory(benchmark, ECGRecord.from_xml_path, path)
+    benchmark.extra_info["record_nbytes"] = record.nbytes
+    benchmark.pedantic(ECGRecord.from_xml_path, args=(path,), rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("window_s", [10, 60])
+def test_load_xml_window(benchmark, xml_record, window_s):
+    path, _ = xml_record
+    record = ECGRecord.from_xml_path(path)
+    stop = min(window_s * record.sample_rate, record.n_samples)
+    window = record_memory(benchmark, record.window, ["I", "aVF", "V2"], 0, stop)
+    assert window.shape == (3, stop)
+    benchmark(record.window, ["I", "aVF", "V2"], 0, stop)
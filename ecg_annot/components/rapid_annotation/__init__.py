@@ -0,0 +1,13 @@
+import os
+
+import streamlit.components.v1 as components
+
+from ecg_annot.flow import flow_config
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_component = components.declare_component("rapid_annotation", path=_FRONTEND_DIR)
+
+
+def rapid_annotation(key: str, answers: dict | None = None, history: list | None = None):
+    """Keyboard-driven flow starting from answers/history; returns {final, seq, answers, history, events} or None."""
+    return _component(config=flow_config(), answers=answers or {}, history=history or [], key=key, default=None)
@@ -91,8 +91,14 @@ T_GRAPH = {
     },
 }
 
+PTB_ORDER = ["I", "II", "III", "aVL", "aVR", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+
 LEADS = ["I", "II", "III", "aVR", "aVL", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
 
+WINDOW_SECONDS = [2.5, 5, 10, 30, 60]
+
+DEFAULT_WINDOW_SECONDS = 10
+
 NOISE_ARTIFACTS_GRAPH = {
     "Noise artifacts": {
         "question": "Select any issues that are present in the ECG signal.",
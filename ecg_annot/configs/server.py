@@ -0,0 +1,28 @@
+import os
+
+ARRAY_STORE_MAX_BYTES = int(os.environ.get("ECG_ANNOT_ARRAY_STORE_MB", "1024")) * 1024 * 1024
+# Memory-mapped records from the shared cache; keep below ECG_ANNOT_SHARED_CACHE_MB so evicted cache files are unmapped.
+ARRAY_STORE_MAX_MAPPED_BYTES = int(os.environ.get("ECG_ANNOT_ARRAY_STORE_MAPPED_MB", "1024")) * 1024 * 1024
+ARRAY_STORE_HOLDER_TTL = float(os.environ.get("ECG_ANNOT_ARRAY_STORE_HOLDER_TTL", str(6 * 60 * 60)))
+DECODE_WORKERS = int(os.environ.get("ECG_ANNOT_DECODE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+DEPLOYMENT = os.environ.get("ECG_ANNOT_DEPLOYMENT", "single")
+RESPONSE_BACKEND = os.environ.get("ECG_ANNOT_RESPONSE_BACKEND", "sheets")
+RESPONSES_DB = os.environ.get("ECG_ANNOT_RESPONSES_DB", "responses.db")
+STATE_DIR = os.environ.get("ECG_ANNOT_STATE_DIR", ".ecg_annot")
+STATE_DB = os.path.join(STATE_DIR, "state.db")
+SHARED_CACHE_DIR = os.path.join(STATE_DIR, "cache")
+SHARED_CACHE_MAX_BYTES = int(os.environ.get("ECG_ANNOT_SHARED_CACHE_MB", "4096")) * 1024 * 1024
+ARCHIVE_DIR = os.path.join(STATE_DIR, "archive")
+UPLOAD_DIR = os.path.join(STATE_DIR, "uploads")
+
+CORPUS_DIR = os.environ.get("ECG_ANNOT_CORPUS_DIR", "data")
+# New corpus files join the worklist when the directory is next listed, at most this often.
+CORPUS_SYNC_SECONDS = float(os.environ.get("ECG_ANNOT_CORPUS_SYNC_SECONDS", "300"))
+MODEL_SCORES = os.environ.get("ECG_ANNOT_MODEL_SCORES")
+TARGET_ANNOTATORS = int(os.environ.get("ECG_ANNOT_TARGET_ANNOTATORS", "2"))
+SERVICE_ACCOUNT_FILE = os.environ.get("ECG_ANNOT_SERVICE_ACCOUNT_FILE")
+SHEET_ID = os.environ.get("ECG_ANNOT_SHEET_ID")
+API_PORT = int(os.environ.get("ECG_ANNOT_API_PORT", "8600"))
+
+METRICS_FILE = os.environ.get("ECG_ANNOT_METRICS_FILE")
@@ -1,9 +1,17 @@
 import xml.etree.ElementTree as ET
-from typing import Dict
+from typing import Callable, Dict, NamedTuple
 import numpy as np
 import base64
+from ecg_annot.configs.annotation import PTB_ORDER
 
-PTB_ORDER = ["I", "II", "III", "aVL", "aVR", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+DEFAULT_SAMPLE_RATE = 500
+DERIVABLE_LEADS = {"III", "aVR", "aVL", "aVF"}
+
+
+class LeadPayload(NamedTuple):
+    waveform_b64: str
+    units_per_bit: float
+    n_samples: int
 
 
 def _prefer_waveform(lead_dict: Dict[str, Dict[str, np.ndarray]], lead_id: str) -> np.ndarray | None:
@@ -32,89 +40,89 @@ def _canon_lead_id(s: str | None) -> str | None:
     return t
 
 
-def _derive_limb_leads(leads: Dict[str, np.ndarray]) -> None:
-    I = leads.get("I")
-    II = leads.get("II")
-    III = leads.get("III")
-    if I is not None and II is not None and III is None:
-        leads["III"] = II - I
-        III = leads["III"]
-    if I is not None and II is not None and III is not None:
-        leads.setdefault("aVR", -0.5 * (I + II))
-        leads.setdefault("aVL", 0.5 * (I - III))
-        leads.setdefault("aVF", 0.5 * (II + III))
-
-
-def _decode_waveform(waveform_b64: str, units_per_bit: float) -> np.ndarray:
-    raw = np.frombuffer(base64.b64decode(waveform_b64), dtype=np.int16).astype(np.float32)
-    return raw * float(units_per_bit)
+def _decode_waveform_raw(waveform_b64: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(waveform_b64, validate=True), dtype=np.int16)
 
 
-def _stack_ptb_12(by_lead: Dict[str, Dict[str, np.ndarray]]) -> np.ndarray:
-    chosen: Dict[str, np.ndarray] = {}
-    for lead_id in list(by_lead.keys()):
-        sel = _prefer_waveform(by_lead, lead_id)
-        if sel is not None:
-            chosen[lead_id] = sel
+def _b64_sample_count(waveform_b64: str) -> int:
+    """Number of int16 samples a base64 payload decodes to, checked without decoding it."""
+    n_bytes = len(waveform_b64) // 4 * 3 - waveform_b64[-2:].count("=")
+    if len(waveform_b64) % 4 or n_bytes % 2:
+        raise ValueError(f"Waveform payload of {len(waveform_b64)} base64 characters is not whole int16 samples")
+    return n_bytes // 2
 
-    _derive_limb_leads(chosen)
-
-    available = {k: v for k, v in chosen.items() if k in set(PTB_ORDER)}
-    missing = [l for l in PTB_ORDER if l not in available]
-    if missing:
-        raise ValueError(f"Missing required leads after derivation: {missing}")
 
-    min_len = min(len(v) for v in available.values())
-    trimmed = {k: v[:min_len] for k, v in available.items()}
-    return np.stack([trimmed[l] for l in PTB_ORDER], axis=0)
-
-
-def _extract_signals_type2(root: ET.Element) -> np.ndarray:
-    by_lead: Dict[str, Dict[str, np.ndarray]] = {}
+def _index_waveforms(root: ET.Element, canonical: bool) -> Dict[str, LeadPayload]:
+    by_lead: Dict[str, Dict[str, LeadPayload]] = {}
     for wf in root.findall(".//Waveform"):
         wf_type = wf.findtext("WaveformType") or ""
         for ld in wf.findall("LeadData"):
-            lead_id = _canon_lead_id(ld.findtext("LeadID"))
+            lead_id = _canon_lead_id(ld.findtext("LeadID")) if canonical else ld.findtext("LeadID")
             if not lead_id:
                 continue
             upb_txt = ld.findtext("LeadAmplitudeUnitsPerBit")
-            try:
-                units_per_bit = float(upb_txt) if upb_txt is not None else 1.0
-            except ValueError:
-                units_per_bit = 1.0
-            wf_b64 = ld.findtext("WaveFormData") or ""
-            arr = _decode_waveform(wf_b64, units_per_bit)
-            by_lead.setdefault(lead_id, {})[wf_type] = arr
-
-    return _stack_ptb_12(by_lead)
+            if canonical:
+                try:
+                    units_per_bit = float(upb_txt) if upb_txt is not None else 1.0
+                except ValueError:
+                    units_per_bit = 1.0
+            else:
+                units_per_bit = float(upb_txt)
+            wf_b64 = "".join((ld.findtext("WaveFormData") or "").split())
+            by_lead.setdefault(lead_id, {})[wf_type] = LeadPayload(wf_b64, units_per_bit, _b64_sample_count(wf_b64))
+
+    chosen = {lead_id: _prefer_waveform(by_lead, lead_id) for lead_id in by_lead}
+    available = set(chosen)
+    if "I" in available and "II" in available:
+        available |= DERIVABLE_LEADS
+    missing = [l for l in PTB_ORDER if l not in available]
+    if missing:
+        raise ValueError(f"Missing required leads after derivation: {missing}")
+    return {k: v for k, v in chosen.items() if k in set(PTB_ORDER)}
 
 
-def _extract_signals_type1(root: ET.Element) -> np.ndarray:
-    by_lead: Dict[str, Dict[str, np.ndarray]] = {}
+def _sample_rate(root: ET.Element) -> int:
     for wf in root.findall(".//Waveform"):
-        wf_type = wf.findtext("WaveformType") or ""
-        for ld in wf.findall("LeadData"):
-            lead_id = ld.findtext("LeadID")
-            if not lead_id:
-                continue
-            units_per_bit = float(ld.findtext("LeadAmplitudeUnitsPerBit"))
-            wf_b64 = ld.findtext("WaveFormData") or ""
-            arr = _decode_waveform(wf_b64, units_per_bit)
-            by_lead.setdefault(lead_id, {})[wf_type] = arr
-
-    return _stack_ptb_12(by_lead)
+        if wf.findtext("WaveformType") == "Rhythm" and wf.findtext("SampleBase"):
+            return int(wf.findtext("SampleBase"))
+    return DEFAULT_SAMPLE_RATE
 
 
-def load_ecg_signals_only(xml_path: str) -> np.ndarray:
-    root = ET.parse(xml_path).getroot()
-
-    first_err: Exception | None = None
+def index_ecg_xml(root: ET.Element, source: str = "XML") -> Dict[str, LeadPayload]:
     try:
-        return _extract_signals_type2(root)
+        return _index_waveforms(root, canonical=True)
     except Exception as e:
         first_err = e
-
     try:
-        return _extract_signals_type1(root)
+        return _index_waveforms(root, canonical=False)
     except Exception as e2:
-        raise RuntimeError(f"Failed to decode ECG from {xml_path} with both XML types. Type2 error: {first_err}; Type1 error: {e2}")
+        raise RuntimeError(f"Failed to decode ECG from {source} with both XML types. Type2 error: {first_err}; Type1 error: {e2}")
+
+
+def assemble_leads(lead_names, source: Callable[[str], np.ndarray | None]) -> np.ndarray:
+    """Stack lead_names from source, deriving limb leads the file does not carry."""
+    decoded: Dict[str, np.ndarray] = {}
+
+    def get(lead: str) -> np.ndarray:
+        if lead not in decoded:
+            found = source(lead)
+            if found is not None:
+                decoded[lead] = found
+            elif lead == "III":
+                decoded[lead] = get("II") - get("I")
+            elif lead == "aVR":
+                decoded[lead] = -0.5 * (get("I") + get("II"))
+            elif lead == "aVL":
+                decoded[lead] = 0.5 * (get("I") - get("III"))
+            elif lead == "aVF":
+                decoded[lead] = 0.5 * (get("II") + get("III"))
+        return decoded[lead]
+
+    return np.stack([get(lead) for lead in lead_names], axis=0)
+
+
+def load_ecg_signals_only(xml_path: str) -> np.ndarray:
+    """Full (12, T) float32 decode of an XML record; the app reads windows through ECGRecord instead."""
+    from ecg_annot.data_utils.records import ECGRecord
+
+    return np.asarray(ECGRecord.from_xml_path(xml_path))
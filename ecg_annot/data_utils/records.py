@@ -0,0 +1,182 @@
+import threading
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Sequence
+import numpy as np
+from ecg_annot.data_utils.prepare_xml import (
+    DEFAULT_SAMPLE_RATE,
+    LeadPayload,
+    PTB_ORDER,
+    _decode_waveform_raw,
+    _sample_rate,
+    assemble_leads,
+    index_ecg_xml,
+)
+
+
+class RecordView:
+    """Array-like access to a record: record[i], record[rows, start:stop] and np.asarray(record)."""
+
+    dtype = np.dtype(np.float32)
+    ndim = 2
+
+    @property
+    def shape(self):
+        return (len(PTB_ORDER), self.n_samples)
+
+    def __len__(self) -> int:
+        return len(PTB_ORDER)
+
+    def __getitem__(self, index):
+        rows, cols = index if isinstance(index, tuple) else (index, slice(None))
+        if not isinstance(cols, slice):
+            raise TypeError("Records are indexed by lead and a sample slice")
+        start, stop, step = cols.indices(self.n_samples)
+        names = PTB_ORDER[rows] if isinstance(rows, slice) else [PTB_ORDER[rows]]
+        window = self.window(names, start, stop)[:, ::step]
+        return window if isinstance(rows, slice) else window[0]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.window(), dtype=dtype)
+
+    def freeze(self) -> None:
+        """Make the backing array read-only; records are shared between sessions once stored."""
+        self._array.flags.writeable = False
+
+    @property
+    def nbytes(self) -> int:
+        """Heap bytes of the backing array; memory-mapped samples are counted in mapped_nbytes instead."""
+        return 0 if isinstance(self._array, np.memmap) else self._array.nbytes
+
+    @property
+    def mapped_nbytes(self) -> int:
+        return self._array.nbytes if isinstance(self._array, np.memmap) else 0
+
+
+class ArrayRecord(RecordView):
+    """Decoded (12, T) signals, possibly memory-mapped, sliced per window."""
+
+    def __init__(self, signals: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE):
+        self.signals = signals
+        self.sample_rate = sample_rate
+
+    @property
+    def _array(self) -> np.ndarray:
+        return self.signals
+
+    @property
+    def n_samples(self) -> int:
+        return self.signals.shape[1]
+
+    def window(self, leads: Sequence[str] | None = None, start: int = 0, stop: int | None = None) -> np.ndarray:
+        start, stop = clamp_window(self.n_samples, start, stop)
+        rows = [PTB_ORDER.index(lead) for lead in leads or PTB_ORDER]
+        return np.asarray(self.signals[rows, start:stop], dtype=np.float32)
+
+
+class ECGRecord(RecordView):
+    """Raw int16 samples of the leads stored in the file and their gains.
+
+    Leads read from XML stay base64 until a window first needs them; each is then decoded once and kept,
+    and III/aVR/aVL/aVF are derived from I and II, so memory follows the leads on screen. Scaling is
+    computed only for the window being read.
+    """
+
+    def __init__(self, samples: np.ndarray | None, lead_names: Sequence[str], gains: Sequence[float], sample_rate: int = DEFAULT_SAMPLE_RATE):
+        self.lead_names = list(lead_names)
+        self.gains = [float(g) for g in gains]
+        self.sample_rate = sample_rate
+        self._rows = {lead: i for i, lead in enumerate(self.lead_names)}
+        self._samples = samples
+        self._payloads: Dict[str, str] = {}
+        self._decoded: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._n_samples = 0 if samples is None else samples.shape[1]
+
+    @classmethod
+    def from_leads(cls, leads: Dict[str, LeadPayload], sample_rate: int = DEFAULT_SAMPLE_RATE) -> "ECGRecord":
+        names = [lead for lead in PTB_ORDER if lead in leads]
+        record = cls(None, names, [leads[lead].units_per_bit for lead in names], sample_rate)
+        record._payloads = {lead: leads[lead].waveform_b64 for lead in names}
+        record._n_samples = min(leads[lead].n_samples for lead in names)
+        return record
+
+    @classmethod
+    def from_xml_bytes(cls, xml_bytes: bytes, source: str = "XML") -> "ECGRecord":
+        root = ET.fromstring(xml_bytes)
+        return cls.from_leads(index_ecg_xml(root, source), _sample_rate(root))
+
+    @classmethod
+    def from_xml_path(cls, xml_path: str) -> "ECGRecord":
+        root = ET.parse(xml_path).getroot()
+        return cls.from_leads(index_ecg_xml(root, xml_path), _sample_rate(root))
+
+    def metadata(self) -> Dict[str, Any]:
+        return {"leads": self.lead_names, "gains": self.gains, "sample_rate": self.sample_rate}
+
+    @classmethod
+    def from_metadata(cls, samples: np.ndarray, metadata: Dict[str, Any]) -> "ECGRecord":
+        return cls(samples, metadata["leads"], metadata["gains"], metadata["sample_rate"])
+
+    def lead_samples(self, lead: str) -> np.ndarray:
+        """int16 samples of a stored lead, decoding its payload on first use."""
+        if self._samples is not None:
+            return self._samples[self._rows[lead]]
+        with self._lock:
+            if lead not in self._decoded:
+                decoded = _decode_waveform_raw(self._payloads.pop(lead))[: self._n_samples]
+                decoded.flags.writeable = False
+                self._decoded[lead] = decoded
+            return self._decoded[lead]
+
+    @property
+    def samples(self) -> np.ndarray:
+        """All stored leads as one (n_leads, T) array, e.g. to write to the shared cache; decodes every lead."""
+        if self._samples is not None:
+            return self._samples
+        return np.stack([self.lead_samples(lead) for lead in self.lead_names])
+
+    def freeze(self) -> None:
+        if self._samples is not None:
+            self._samples.flags.writeable = False
+
+    @property
+    def nbytes(self) -> int:
+        """Heap bytes held now: the leads decoded so far and the payloads of the rest, or the sample array."""
+        if self._samples is not None:
+            return 0 if isinstance(self._samples, np.memmap) else self._samples.nbytes
+        # Read without the lock so that sizing a record never waits on a lead being decoded.
+        payloads, decoded = list(self._payloads.values()), list(self._decoded.values())
+        return sum(len(payload) for payload in payloads) + sum(lead.nbytes for lead in decoded)
+
+    @property
+    def mapped_nbytes(self) -> int:
+        return self._samples.nbytes if isinstance(self._samples, np.memmap) else 0
+
+    @property
+    def n_samples(self) -> int:
+        return self._n_samples
+
+    def window(self, leads: Sequence[str] | None = None, start: int = 0, stop: int | None = None) -> np.ndarray:
+        start, stop = clamp_window(self.n_samples, start, stop)
+
+        def scaled(lead: str) -> np.ndarray | None:
+            row = self._rows.get(lead)
+            if row is None:
+                return None
+            return self.lead_samples(lead)[start:stop].astype(np.float32) * self.gains[row]
+
+        return assemble_leads(list(leads or PTB_ORDER), scaled)
+
+
+def clamp_window(n_samples: int, start: int, stop: int | None) -> tuple[int, int]:
+    stop = n_samples if stop is None else min(int(stop), n_samples)
+    start = min(max(int(start), 0), stop)
+    return start, stop
+
+
+def load_ecg_record(path: str) -> RecordView:
+    if path.endswith(".xml"):
+        return ECGRecord.from_xml_path(path)
+    from ecg_annot.data_utils.prepare_np import load_ecg_signals_only
+
+    return ArrayRecord(load_ecg_signals_only(path))
@@ -0,0 +1,270 @@
+from typing import Any, MutableMapping
+
+from ecg_annot.configs.annotation import (
+    ALL_QUESTIONS_GRAPH,
+    QRS_QUESTION_ORDER,
+    NOISE_ARTIFACTS_QUESTION_ORDER,
+    T_QUESTION_ORDER,
+    ALL_QUESTION_ORDER,
+    NOISE_LEAD_QUESTIONS,
+    NOISE_TO_LEAD_QUESTION,
+)
+
+DURATION_FOLLOWUPS = [">120", "110-120", "<110"]
+# A multilabel choice that excludes every other one (Noise artifacts: "None").
+NONE_CHOICE = "None"
+
+
+def new_flow_state() -> dict:
+    return {
+        "current_question_index": 0,
+        "answers": {},
+        "navigation_history": [],
+        "show_review": False,
+    }
+
+
+def clean_duration_answers(answers):
+    clean = dict(answers)
+    duration = clean.get("Duration")
+    keep = [duration] if duration in DURATION_FOLLOWUPS else []
+    for opt in DURATION_FOLLOWUPS:
+        if opt not in keep:
+            clean.pop(opt, None)
+    return clean
+
+
+def validate_answer(question_key: str, selected: Any) -> None:
+    if question_key not in ALL_QUESTIONS_GRAPH:
+        raise ValueError(f"Unknown question: {question_key}")
+    question_data = ALL_QUESTIONS_GRAPH[question_key]
+    choices = question_data["choices"]
+    if question_data.get("multilabel"):
+        if not isinstance(selected, list):
+            raise ValueError(f"{question_key} expects a list of choices")
+        invalid = [s for s in selected if s not in choices]
+        if invalid:
+            raise ValueError(f"Invalid choices for {question_key}: {invalid}")
+        if len(set(selected)) != len(selected):
+            raise ValueError(f"Duplicate choices for {question_key}")
+        if NONE_CHOICE in selected and len(selected) > 1:
+            raise ValueError(f'"{NONE_CHOICE}" cannot be selected together with other choices for {question_key}')
+    elif selected not in choices:
+        raise ValueError(f"Invalid choice for {question_key}: {selected!r}")
+
+
+def validate_answers(answers: dict) -> None:
+    replayed = {}
+    while (key := get_next_question_key(0, replayed)) is not None:
+        if key not in answers:
+            raise ValueError(f"Missing answer for {key}")
+        validate_answer(key, answers[key])
+        replayed[key] = answers[key]
+    extra = sorted(set(answers) - set(replayed))
+    if extra:
+        raise ValueError(f"Answers given for questions outside the flow: {extra}")
+
+
+def flow_config() -> dict:
+    return {
+        "questions": ALL_QUESTIONS_GRAPH,
+        "qrs_order": QRS_QUESTION_ORDER,
+        "t_order": T_QUESTION_ORDER,
+        "noise_to_lead": list(NOISE_TO_LEAD_QUESTION.items()),
+        "duration_followups": DURATION_FOLLOWUPS,
+    }
+
+
+def find_last_answered(question_list, answers):
+    for i in range(len(question_list) - 1, -1, -1):
+        if question_list[i] in answers:
+            return i
+    return -1
+
+
+def get_question_index(key):
+    if key in NOISE_ARTIFACTS_QUESTION_ORDER:
+        return NOISE_ARTIFACTS_QUESTION_ORDER.index(key)
+    if key in QRS_QUESTION_ORDER:
+        return len(NOISE_ARTIFACTS_QUESTION_ORDER) + QRS_QUESTION_ORDER.index(key)
+    if key in T_QUESTION_ORDER:
+        return len(NOISE_ARTIFACTS_QUESTION_ORDER) + len(QRS_QUESTION_ORDER) + T_QUESTION_ORDER.index(key)
+    return len(ALL_QUESTION_ORDER)
+
+
+def should_skip_ap(answers):
+    return answers.get("Preexcitation") == "No"
+
+
+def is_qrs_complete(answers):
+    if answers.get("QRS") == "No (Asystole)":
+        return True
+    if answers.get("Preexcitation") == "Yes" and "AP" in answers:
+        return True
+    skip_ap = should_skip_ap(answers)
+    for key in QRS_QUESTION_ORDER:
+        if skip_ap and key == "AP":
+            continue
+        if key not in answers:
+            return False
+    duration_answer = answers.get("Duration")
+    return not (duration_answer in DURATION_FOLLOWUPS and duration_answer not in answers)
+
+
+def get_next_question_key(current_index, answers):
+    if "Noise artifacts" not in answers:
+        return "Noise artifacts"
+    noise_answers = answers.get("Noise artifacts", [])
+    if noise_answers != [NONE_CHOICE]:
+        for noise_type, lead_key in NOISE_TO_LEAD_QUESTION.items():
+            if noise_type in noise_answers and lead_key not in answers:
+                return lead_key
+    if not is_qrs_complete(answers):
+        skip_ap = should_skip_ap(answers)
+        for key in QRS_QUESTION_ORDER:
+            if skip_ap and key == "AP":
+                continue
+            if key not in answers:
+                return key
+        duration_answer = answers.get("Duration")
+        if duration_answer in DURATION_FOLLOWUPS and duration_answer not in answers:
+            return duration_answer
+    for key in T_QUESTION_ORDER:
+        if key not in answers:
+            return key
+    return None
+
+
+def has_more_questions(answers):
+    return get_next_question_key(0, answers) is not None
+
+
+def current_question_key(state: MutableMapping[str, Any]) -> str | None:
+    return get_next_question_key(state["current_question_index"], state["answers"])
+
+
+def update_navigation_history(state: MutableMapping[str, Any], new_question_key):
+    history = state["navigation_history"]
+    if not history or history[-1] != new_question_key:
+        history.append(new_question_key)
+    state["navigation_history"] = history
+
+
+def start_flow(state: MutableMapping[str, Any]) -> None:
+    first_question = get_next_question_key(0, {})
+    if first_question:
+        update_navigation_history(state, first_question)
+
+
+def go_back_to_noise(answers):
+    last_idx = find_last_answered(NOISE_ARTIFACTS_QUESTION_ORDER, answers)
+    if last_idx >= 0:
+        answers.pop(NOISE_ARTIFACTS_QUESTION_ORDER[last_idx], None)
+        return last_idx
+    return 0
+
+
+def apply_next(state: MutableMapping[str, Any], question_key, selected) -> str | None:
+    answers = state["answers"]
+    answers[question_key] = selected
+    update_navigation_history(state, question_key)
+    if question_key == "Duration":
+        for opt in DURATION_FOLLOWUPS:
+            answers.pop(opt, None)
+
+    current_idx = get_question_index(question_key)
+    if question_key == "Duration":
+        state["current_question_index"] = current_idx
+    else:
+        state["current_question_index"] = current_idx + 1
+
+    next_key = get_next_question_key(state["current_question_index"], answers)
+    if next_key:
+        update_navigation_history(state, next_key)
+    else:
+        state["show_review"] = True
+    return next_key
+
+
+def replay_answers(answers: dict, history) -> dict:
+    """Flow state reached by answering history's questions in order, e.g. to continue rapid-mode progress step by step."""
+    state = new_flow_state()
+    start_flow(state)
+    for key in history:
+        if key in answers:
+            apply_next(state, key, answers[key])
+    return state
+
+
+def apply_back(state: MutableMapping[str, Any], question_key) -> None:
+    answers = state["answers"]
+    history = state["navigation_history"]
+
+    if history and history[-1] == question_key:
+        history.pop()
+
+    if question_key in DURATION_FOLLOWUPS:
+        answers.pop("Duration", None)
+        state["current_question_index"] = len(NOISE_ARTIFACTS_QUESTION_ORDER) + QRS_QUESTION_ORDER.index("Duration")
+    elif question_key in T_QUESTION_ORDER:
+        answers.pop(question_key, None)
+        last_qrs_idx = find_last_answered(QRS_QUESTION_ORDER, answers)
+        if last_qrs_idx >= 0:
+            answers.pop(QRS_QUESTION_ORDER[last_qrs_idx], None)
+            state["current_question_index"] = len(NOISE_ARTIFACTS_QUESTION_ORDER) + last_qrs_idx
+        else:
+            state["current_question_index"] = go_back_to_noise(answers)
+    elif question_key in QRS_QUESTION_ORDER:
+        answers.pop(question_key, None)
+        qrs_idx = QRS_QUESTION_ORDER.index(question_key)
+        if qrs_idx > 0:
+            answers.pop(QRS_QUESTION_ORDER[qrs_idx - 1], None)
+            state["current_question_index"] = len(NOISE_ARTIFACTS_QUESTION_ORDER) + qrs_idx - 1
+        else:
+            state["current_question_index"] = go_back_to_noise(answers)
+    elif question_key in NOISE_LEAD_QUESTIONS:
+        answers.pop(question_key, None)
+        noise_answers = answers.get("Noise artifacts", [])
+        prev_lead_key = None
+        for noise_type, lead_key in NOISE_TO_LEAD_QUESTION.items():
+            if lead_key == question_key:
+                break
+            if noise_type in noise_answers:
+                prev_lead_key = lead_key
+        if prev_lead_key:
+            answers.pop(prev_lead_key, None)
+            state["current_question_index"] = NOISE_ARTIFACTS_QUESTION_ORDER.index(prev_lead_key)
+        else:
+            answers.pop("Noise artifacts", None)
+            state["current_question_index"] = 0
+    else:
+        new_index = state["current_question_index"] - 1
+        if 0 <= new_index < len(NOISE_ARTIFACTS_QUESTION_ORDER):
+            answers.pop(NOISE_ARTIFACTS_QUESTION_ORDER[new_index], None)
+            state["current_question_index"] = new_index
+
+    state["navigation_history"] = history
+
+
+def apply_review_back(state: MutableMapping[str, Any]) -> None:
+    answers = state["answers"]
+    state["show_review"] = False
+    history = state["navigation_history"]
+    if history:
+        history.pop()
+    for followup in DURATION_FOLLOWUPS:
+        if followup in answers:
+            answers.pop(followup, None)
+            state["current_question_index"] = len(ALL_QUESTION_ORDER)
+            return
+    last_idx = find_last_answered(ALL_QUESTION_ORDER, answers)
+    if last_idx >= 0:
+        answers.pop(ALL_QUESTION_ORDER[last_idx], None)
+        state["current_question_index"] = last_idx
+    else:
+        state["current_question_index"] = 0
+
+
+def navigate_to(state: MutableMapping[str, Any], question_key) -> None:
+    state["current_question_index"] = get_question_index(question_key)
+    state["show_review"] = False
@@ -1,28 +1,64 @@
 import streamlit as st
-from datetime import datetime
 import uuid
 import json
-import pandas as pd
-import numpy as np
+import time
 import tempfile
+import threading
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor
 from ecg_annot.configs.annotation import (
     ALL_QUESTIONS_GRAPH,
     QRS_QUESTION_ORDER,
     NOISE_ARTIFACTS_QUESTION_ORDER,
     T_QUESTION_ORDER,
     ALL_QUESTION_ORDER,
-    NOISE_LEAD_QUESTIONS,
-    NOISE_TO_LEAD_QUESTION,
+    PTB_ORDER,
+    WINDOW_SECONDS,
+    DEFAULT_WINDOW_SECONDS,
 )
-from ecg_annot.data_utils.prepare_xml import load_ecg_signals_only as load_ecg_xml, PTB_ORDER
-from ecg_annot.data_utils.prepare_np import load_ecg_signals_only as load_ecg_np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import gspread
-from google.oauth2.service_account import Credentials
+from ecg_annot.flow import (
+    DURATION_FOLLOWUPS,
+    apply_back,
+    apply_next,
+    apply_review_back,
+    current_question_key,
+    replay_answers,
+    navigate_to,
+    start_flow,
+    validate_answer,
+    validate_answers,
+)
+from ecg_annot.configs.server import (
+    DEPLOYMENT,
+    RESPONSE_BACKEND,
+    RESPONSES_DB,
+    STATE_DB,
+    SHARED_CACHE_DIR,
+    SHARED_CACHE_MAX_BYTES,
+    METRICS_FILE,
+    CORPUS_DIR,
+    CORPUS_SYNC_SECONDS,
+    MODEL_SCORES,
+    TARGET_ANNOTATORS,
+    ARCHIVE_DIR,
+    DECODE_WORKERS,
+    UPLOAD_DIR,
+    ARRAY_STORE_HOLDER_TTL,
+)
+from ecg_annot.server.array_store import content_key, shared_array_store
+from ecg_annot.server.sqlite_sheet import HEADER, SqliteWorksheet
+from ecg_annot.server.campaigns import DEFAULT_PARTITION, CampaignStore, read_snapshot_records
+from ecg_annot.server.user_state import UserStateStore
+from ecg_annot.server.checkpoints import CheckpointStore
+from ecg_annot.server.corpus_index import AGREEMENT_STATUSES, SORT_COLUMNS, CorpusIndex
+from ecg_annot.server.scheduler import Scheduler, default_scorers
+from ecg_annot.server.upload_queue import discard_upload, keep_spooled, pop_ready, submit_upload
+from ecg_annot.server.responses import save_responses
+from ecg_annot.server.validate import summarize, validate_records
+from ecg_annot.server.events import client_events, shared_event_log
+from ecg_annot.server.metrics import METRICS, BUCKETS_S, InstrumentedWorksheet, span, start_file_exporter, timed
 import base64
-from streamlit_agraph import agraph, Node, Edge, Config
 
 st.set_page_config(
     page_title="ECG Annotation",
@@ -31,161 +67,326 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-DURATION_FOLLOWUPS = [">120", "110-120", "<110"]
+
+@st.cache_resource
+def get_user_state_store():
+    if DEPLOYMENT != "multi":
+        return None
+    os.makedirs(os.path.dirname(STATE_DB), exist_ok=True)
+    return UserStateStore(STATE_DB)
+
+
+@st.cache_resource
+def get_shared_cache():
+    if DEPLOYMENT != "multi":
+        return None
+    from ecg_annot.server.shared_cache import SharedCache
+
+    return SharedCache(SHARED_CACHE_DIR, SHARED_CACHE_MAX_BYTES)
+
+
+@st.cache_resource
+def get_checkpoint_store():
+    os.makedirs(os.path.dirname(STATE_DB), exist_ok=True)
+    return CheckpointStore(STATE_DB)
+
+
+@st.cache_resource
+def get_corpus_index():
+    os.makedirs(os.path.dirname(STATE_DB), exist_ok=True)
+    return CorpusIndex(STATE_DB)
+
+
+@st.cache_resource
+def get_campaign_store():
+    os.makedirs(os.path.dirname(STATE_DB), exist_ok=True)
+    return CampaignStore(STATE_DB)
+
+
+@st.cache_resource
+def get_archived_corpus_index(campaign_id):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    index = CorpusIndex(os.path.join(ARCHIVE_DIR, f"campaign_{campaign_id}.db"))
+    if index.is_empty():
+        index.rebuild(load_campaign_records(get_campaign_store().get(campaign_id)), list_corpus_files())
+    return index
+
+
+def list_corpus_files():
+    if not os.path.isdir(CORPUS_DIR):
+        return []
+    return [f for f in os.listdir(CORPUS_DIR) if f.endswith((".xml", ".npy", ".png", ".pdf"))]
+
+
+@st.cache_resource
+def get_scheduler():
+    os.makedirs(os.path.dirname(STATE_DB), exist_ok=True)
+    scheduler = Scheduler(STATE_DB, default_scorers(MODEL_SCORES, TARGET_ANNOTATORS))
+    scheduler.add_files(list_corpus_files())
+    return scheduler
+
+
+@st.cache_resource(ttl=CORPUS_SYNC_SECONDS)
+def corpus_files():
+    """Corpus filenames, re-listed at most every CORPUS_SYNC_SECONDS; new files join the worklist on each listing."""
+    files = frozenset(list_corpus_files())
+    get_scheduler().add_files(files)
+    return files
+
+
+CHECKPOINT_KEYS = [
+    "record_key",
+    "rapid_mode",
+    "current_filename",
+    "file_type",
+    "selected_leads",
+    "current_question_index",
+    "answers",
+    "navigation_history",
+    "show_review",
+]
+
+
+def save_checkpoint():
+    get_checkpoint_store().save(st.session_state["user_id"], {key: st.session_state[key] for key in CHECKPOINT_KEYS})
+
+
+def clear_checkpoint():
+    get_checkpoint_store().clear(st.session_state["user_id"])
+
+
+def restore_checkpoint():
+    checkpoint = get_checkpoint_store().load(st.session_state["user_id"])
+    if checkpoint:
+        st.session_state.update(checkpoint)
+        st.session_state.update({"role": "guest", "file_uploaded": True})
+
+
+def get_stable_user_id():
+    user_id = st.query_params.get("uid") or str(uuid.uuid4())
+    st.query_params["uid"] = user_id
+    return user_id
+
+
+def load_completed_files():
+    store = get_user_state_store()
+    return store.completed_files(st.session_state["user_id"]) if store else []
 
 
 def init_session_state():
+    is_new_session = "user_id" not in st.session_state
     defaults = {
-        "user_id": lambda: str(uuid.uuid4()),
+        "user_id": get_stable_user_id,
+        "session_id": lambda: str(uuid.uuid4()),
         "role": None,
         "current_question_index": 0,
         "answers": dict,
-        "ecg_data": None,
+        "record_key": None,
         "selected_leads": lambda: PTB_ORDER[:],
         "file_uploaded": False,
         "current_filename": None,
-        "completed_files": list,
+        "completed_files": load_completed_files,
         "submission_complete": False,
         "reset_confirmed": False,
         "file_type": None,
-        "visualization_data": None,
         "show_graph": True,
         "navigation_history": list,
         "show_review": False,
+        "rapid_mode": False,
+        "rapid_round": 0,
+        "rapid_seq": None,
+        "question_shown": None,
+        "window_start": 0.0,
+        "window_seconds": DEFAULT_WINDOW_SECONDS,
+        "decode_jobs": dict,
+        "upload_queue": list,
+        "upload_errors": list,
+        "upload_batch": 0,
     }
     for key, default in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = default() if callable(default) else default
+    if is_new_session:
+        restore_checkpoint()
 
 
 init_session_state()
+if METRICS_FILE:
+    start_file_exporter(METRICS_FILE)
 
 
 @st.cache_resource
 def get_sheets_client():
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     scopes = ["https://www.googleapis.com/auth/spreadsheets"]
     creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scopes)
     return gspread.authorize(creds)
 
 
+def get_array_store():
+    return shared_array_store()
+
+
+def hold_record(key, loader):
+    store = get_array_store()
+    previous = st.session_state["record_key"]
+    value = store.acquire(key, st.session_state["session_id"], loader)
+    if previous != key:
+        store.release(previous, st.session_state["session_id"])
+    st.session_state["record_key"] = key
+    return value
+
+
+def get_held_record():
+    key = st.session_state["record_key"]
+    if key is None:
+        return None
+    record = get_array_store().get(key, st.session_state["session_id"])
+    cache = get_shared_cache()
+    if record is None and cache is not None:
+        cached = open_cached_record(cache, key, st.session_state["current_filename"] or "")
+        if cached is not None:
+            record = hold_record(key, lambda: cached)
+    return record
+
+
+def open_cached_record(cache, key, filename):
+    from ecg_annot.data_utils.records import ArrayRecord, ECGRecord
+
+    if filename.endswith(".xml"):
+        samples, metadata = cache.get_array(key), cache.get_bytes(key)
+        if samples is None or metadata is None:
+            return None
+        return ECGRecord.from_metadata(samples, json.loads(metadata))
+    if filename.endswith(".npy"):
+        samples = cache.get_array(key)
+        return None if samples is None else ArrayRecord(samples)
+    return cache.get_bytes(key)
+
+
+def release_record():
+    get_array_store().release(st.session_state.get("record_key"), st.session_state["session_id"])
+    st.session_state["record_key"] = None
+
+
+def load_shared_blob(key, loader):
+    cache = get_shared_cache()
+    return loader() if cache is None else cache.blob(key, loader)
+
+
+@st.cache_resource
+def get_sqlite_worksheet(partition=DEFAULT_PARTITION):
+    return SqliteWorksheet(RESPONSES_DB, partition)
+
+
+def open_partition(partition):
+    if RESPONSE_BACKEND == "sqlite":
+        return get_sqlite_worksheet(partition)
+    return get_sheets_worksheet(partition)
+
+
 def get_worksheet():
-    return get_sheets_client().open_by_key(st.secrets["SHEET_ID"]).sheet1
+    return InstrumentedWorksheet(open_partition(get_campaign_store().active()["partition"]))
+
 
+@st.cache_resource
+def get_spreadsheet():
+    with span("backend.open_worksheet"):
+        return get_sheets_client().open_by_key(st.secrets["SHEET_ID"])
 
-def clean_duration_answers(answers):
-    clean = dict(answers)
-    duration = clean.get("Duration")
-    keep = [duration] if duration in DURATION_FOLLOWUPS else []
-    for opt in DURATION_FOLLOWUPS:
-        if opt not in keep:
-            clean.pop(opt, None)
-    return clean
 
+@st.cache_resource
+def get_sheets_worksheet(partition=DEFAULT_PARTITION):
+    spreadsheet = get_spreadsheet()
+    return spreadsheet.sheet1 if partition == DEFAULT_PARTITION else spreadsheet.worksheet(partition)
 
-def save_all_responses(answers: dict, filename: str | None):
-    clean_answers = clean_duration_answers(answers)
-    user_id = st.session_state["user_id"]
-    ws = get_worksheet()
-    all_data = ws.get_all_records()
-    existing_row = next((i + 2 for i, row in enumerate(all_data) if row.get("user_id") == user_id), None)
-    current_data = json.loads(all_data[existing_row - 2].get("data", "{}")) if existing_row else {}
-    file_data = {ALL_QUESTIONS_GRAPH[key]["question"]: answer for key, answer in clean_answers.items()}
-    file_data["updated_at"] = datetime.utcnow().isoformat(timespec="seconds")
-    current_data[filename] = file_data
-    data_str = json.dumps(current_data)
-    if existing_row:
-        ws.update_cell(existing_row, 3, data_str)
-    else:
-        ws.append_row([user_id, datetime.utcnow().isoformat(timespec="seconds"), data_str])
 
+def create_partition(partition):
+    if RESPONSE_BACKEND == "sheets":
+        get_spreadsheet().add_worksheet(title=partition, rows=1000, cols=len(HEADER)).append_row(HEADER)
+    open_partition(partition)
 
-def find_last_answered(question_list, answers):
-    for i in range(len(question_list) - 1, -1, -1):
-        if question_list[i] in answers:
-            return i
-    return -1
 
+def load_campaign_records(campaign):
+    if campaign["snapshot"] and os.path.exists(campaign["snapshot"]):
+        return read_snapshot_records(campaign["snapshot"])
+    return open_partition(campaign["partition"]).get_all_records()
 
-def get_question_index(key):
-    if key in NOISE_ARTIFACTS_QUESTION_ORDER:
-        return NOISE_ARTIFACTS_QUESTION_ORDER.index(key)
-    if key in QRS_QUESTION_ORDER:
-        return len(NOISE_ARTIFACTS_QUESTION_ORDER) + QRS_QUESTION_ORDER.index(key)
-    if key in T_QUESTION_ORDER:
-        return len(NOISE_ARTIFACTS_QUESTION_ORDER) + len(QRS_QUESTION_ORDER) + T_QUESTION_ORDER.index(key)
-    return len(ALL_QUESTION_ORDER)
 
+@timed("save_all_responses")
+def save_all_responses(answers: dict, filename: str | None):
+    file_data = save_responses(get_worksheet(), st.session_state["user_id"], filename, answers)
+    get_corpus_index().record_submission(st.session_state["user_id"], filename, file_data)
+    get_scheduler().record_submission(st.session_state["user_id"], filename, file_data)
 
-def should_skip_ap(answers):
-    return answers.get("Preexcitation") == "No"
 
+@timed("load_all_users")
+def load_all_users(campaign=None):
+    import pandas as pd
 
-def is_qrs_complete(answers):
-    if answers.get("QRS") == "No (Asystole)":
-        return True
-    if answers.get("Preexcitation") == "Yes" and "AP" in answers:
-        return True
-    skip_ap = should_skip_ap(answers)
-    for key in QRS_QUESTION_ORDER:
-        if skip_ap and key == "AP":
-            continue
-        if key not in answers:
-            return False
-    duration_answer = answers.get("Duration")
-    return not (duration_answer in DURATION_FOLLOWUPS and duration_answer not in answers)
+    if campaign is None or campaign["archived_at"] is None:
+        return pd.DataFrame(get_worksheet().get_all_records())
+    return pd.DataFrame(load_campaign_records(campaign))
 
 
-def get_next_question_key(current_index, answers):
-    if "Noise artifacts" not in answers:
-        return "Noise artifacts"
-    noise_answers = answers.get("Noise artifacts", [])
-    if noise_answers != ["None"]:
-        for noise_type, lead_key in NOISE_TO_LEAD_QUESTION.items():
-            if noise_type in noise_answers and lead_key not in answers:
-                return lead_key
-    if not is_qrs_complete(answers):
-        skip_ap = should_skip_ap(answers)
-        for key in QRS_QUESTION_ORDER:
-            if skip_ap and key == "AP":
-                continue
-            if key not in answers:
-                return key
-        duration_answer = answers.get("Duration")
-        if duration_answer in DURATION_FOLLOWUPS and duration_answer not in answers:
-            return duration_answer
-    for key in T_QUESTION_ORDER:
-        if key not in answers:
-            return key
-    return None
+SNAPSHOTS_RUNNING = set()
+SNAPSHOTS_LOCK = threading.Lock()
 
 
-def has_more_questions(answers):
-    return get_next_question_key(0, answers) is not None
+def snapshot_campaign(store, campaign, ws):
+    path = os.path.join(ARCHIVE_DIR, f"campaign_{campaign['id']}.parquet")
+    try:
+        with span("campaign.snapshot"):
+            store.snapshot(campaign, ws, path)
+    finally:
+        with SNAPSHOTS_LOCK:
+            SNAPSHOTS_RUNNING.discard(campaign["id"])
 
 
-def load_all_users():
-    return pd.DataFrame(get_worksheet().get_all_records())
+def start_snapshot(store, campaign):
+    with SNAPSHOTS_LOCK:
+        if campaign["id"] in SNAPSHOTS_RUNNING:
+            return
+        SNAPSHOTS_RUNNING.add(campaign["id"])
+    args = (store, campaign, open_partition(campaign["partition"]))
+    threading.Thread(target=snapshot_campaign, args=args, name=f"snapshot-campaign-{campaign['id']}").start()
 
 
-def reset_database():
-    ws = get_worksheet()
-    ws.clear()
-    ws.append_row(["user_id", "created_at", "data"])
+def resume_pending_snapshots():
+    store = get_campaign_store()
+    for campaign in store.pending_snapshots():
+        start_snapshot(store, campaign)
+
+
+def archive_campaign():
+    store = get_campaign_store()
+    with span("campaign.start"):
+        old, _ = store.start_next(create_partition)
+    corpus_files.clear()
+    get_corpus_index().rebuild([], corpus_files())
+    get_scheduler().backfill([])
+    # Completed files are per campaign; the API and multi-worker sessions read them from state.db.
+    UserStateStore(STATE_DB).clear_all_completed_files()
+    st.session_state["completed_files"] = []
+    start_snapshot(store, old)
 
 
 def reset_session_for_new_file():
+    release_record()
     st.session_state.update({
         "current_question_index": 0,
         "answers": {},
-        "ecg_data": None,
         "selected_leads": PTB_ORDER[:],
         "file_uploaded": False,
         "current_filename": None,
         "submission_complete": False,
         "file_type": None,
-        "visualization_data": None,
         "navigation_history": [],
         "show_review": False,
+        "question_shown": None,
+        "window_start": 0.0,
     })
 
 
@@ -251,7 +452,12 @@ st.markdown(
 
 def back_to_portal():
     if st.button("Back to Portal"):
+        clear_checkpoint()
+        store = get_user_state_store()
+        if store:
+            store.clear_completed_files(st.session_state["user_id"])
         st.session_state.update({"role": None, "completed_files": []})
+        clear_upload_queue()
         reset_session_for_new_file()
         st.rerun()
 
@@ -293,23 +499,66 @@ def render_lead_selection():
     return selected_leads or PTB_ORDER[:]
 
 
-def render_ecg_plot(ecg_data, selected_leads):
-    time_axis = np.arange(ecg_data.shape[1])
+def build_ecg_figure(ecg_data, selected_leads, start=0):
+    import numpy as np
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    time_axis = np.arange(start, start + ecg_data.shape[1])
     if len(selected_leads) == 1:
-        idx = PTB_ORDER.index(selected_leads[0])
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=time_axis, y=ecg_data[idx], mode="lines", name=selected_leads[0]))
+        fig.add_trace(go.Scatter(x=time_axis, y=ecg_data[0], mode="lines", name=selected_leads[0]))
         fig.update_layout(xaxis_title="Time", yaxis_title="Amplitude")
     else:
         fig = make_subplots(rows=len(selected_leads), cols=1, shared_xaxes=False, vertical_spacing=0.02)
         for i, lead in enumerate(selected_leads):
-            idx = PTB_ORDER.index(lead)
-            fig.add_trace(go.Scatter(x=time_axis, y=ecg_data[idx], mode="lines", name=lead), row=i + 1, col=1)
+            fig.add_trace(go.Scatter(x=time_axis, y=ecg_data[i], mode="lines", name=lead), row=i + 1, col=1)
             fig.update_yaxes(title_text=lead, row=i + 1, col=1)
             if i < len(selected_leads) - 1:
                 fig.update_xaxes(showticklabels=False, row=i + 1, col=1)
         fig.update_xaxes(title_text="Time", row=len(selected_leads), col=1)
         fig.update_layout(height=200 * len(selected_leads), showlegend=False)
+    return fig
+
+
+def shift_window(direction):
+    step = st.session_state["window_seconds"] * direction
+    st.session_state["window_start"] = max(st.session_state["window_start"] + step, 0.0)
+
+
+def render_timeline(record):
+    sample_rate = record.sample_rate
+    duration = record.n_samples / sample_rate
+    if duration <= DEFAULT_WINDOW_SECONDS:
+        return 0, record.n_samples
+
+    options = [s for s in WINDOW_SECONDS if s < duration]
+    if st.session_state["window_seconds"] not in options:
+        st.session_state["window_seconds"] = options[-1]
+    window_col, slider_col, prev_col, next_col = st.columns([1, 5, 1, 1], vertical_alignment="bottom")
+    window_seconds = window_col.selectbox("Window (s)", options, key="window_seconds")
+    max_start = float(duration - window_seconds)
+    st.session_state["window_start"] = min(float(st.session_state["window_start"]), max_start)
+    window_start = slider_col.slider("Timeline (s)", 0.0, max_start, key="window_start", step=0.5)
+    prev_col.button("◀", on_click=shift_window, args=(-1,), disabled=window_start <= 0, width="stretch")
+    next_col.button("▶", on_click=shift_window, args=(1,), disabled=window_start >= max_start, width="stretch")
+
+    start = int(window_start * sample_rate)
+    return start, min(start + int(window_seconds * sample_rate), record.n_samples)
+
+
+@timed("render_ecg_plot")
+def render_ecg_plot(record, selected_leads, start, stop):
+    def build():
+        with span("decode.window"):
+            window = record.window(selected_leads, start, stop)
+        return build_ecg_figure(window, selected_leads, start)
+
+    if get_shared_cache() is None:
+        fig = build()
+    else:
+        fig_key = content_key(f"{st.session_state['record_key']}:{','.join(selected_leads)}:{start}:{stop}".encode("utf-8"))
+        fig = json.loads(load_shared_blob(fig_key, lambda: build().to_json().encode("utf-8")))
     st.plotly_chart(fig, width="stretch")
 
 
@@ -334,6 +583,8 @@ def get_node_color(node_id, current_question_key):
 
 
 def build_traversed_edges():
+    from streamlit_agraph import Edge
+
     edges = []
     history = st.session_state["navigation_history"]
     for i in range(len(history) - 1):
@@ -344,14 +595,17 @@ def build_traversed_edges():
 
 
 def navigate_to_question(question_key):
-    st.session_state["current_question_index"] = get_question_index(question_key)
-    st.session_state["show_review"] = False
+    navigate_to(st.session_state, question_key)
+    save_checkpoint()
     st.rerun()
 
 
+@timed("render_question_graph")
 def render_question_graph(current_question_key):
     import random
 
+    from streamlit_agraph import agraph, Node, Config
+
     random.seed(42)
 
     all_keys = NOISE_ARTIFACTS_QUESTION_ORDER + QRS_QUESTION_ORDER + DURATION_FOLLOWUPS + T_QUESTION_ORDER
@@ -395,43 +649,190 @@ def render_question_graph(current_question_key):
         st.rerun()
 
 
-def update_navigation_history(new_question_key):
-    history = st.session_state["navigation_history"]
-    if not history or history[-1] != new_question_key:
-        history.append(new_question_key)
-    st.session_state["navigation_history"] = history
+def decode_npy_file(file_bytes):
+    from ecg_annot.data_utils.prepare_np import load_ecg_signals_only
 
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".npy") as tmp_file:
+        tmp_file.write(file_bytes)
+        tmp_path = tmp_file.name
+    try:
+        with span("decode.npy"):
+            return load_ecg_signals_only(tmp_path)
+    finally:
+        os.unlink(tmp_path)
 
-def render_file_upload_page():
-    render_page_header("ECG Annotation", "Upload ECG File")
-    uploaded_file = st.file_uploader("Upload a file", type=["xml", "npy", "png", "pdf"], accept_multiple_files=False)
-    if uploaded_file is None:
-        return
-    filename = uploaded_file.name
-    file_bytes = uploaded_file.getvalue()
-
-    if filename.endswith((".xml", ".npy")):
-        suffix = ".xml" if filename.endswith(".xml") else ".npy"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            tmp_file.write(file_bytes)
-            tmp_path = tmp_file.name
-        try:
-            loader = load_ecg_xml if filename.endswith(".xml") else load_ecg_np
-            st.session_state["ecg_data"] = loader(tmp_path)
-            st.session_state["file_type"] = "signal"
-        finally:
-            os.unlink(tmp_path)
-    elif filename.endswith((".png", ".pdf")):
-        st.session_state["visualization_data"] = file_bytes
-        st.session_state["file_type"] = "visualization"
 
+def decode_xml_file(filename, file_bytes):
+    from ecg_annot.data_utils.records import ECGRecord
+
+    with span("decode.xml"):
+        return ECGRecord.from_xml_bytes(file_bytes, filename)
+
+
+# Runs on decode pool threads as well as the script thread, so it takes the shared cache as an argument.
+def decode_file(key, filename, file_bytes, cache):
+    from ecg_annot.data_utils.records import ArrayRecord
+
+    if filename.endswith(".npy"):
+        return ArrayRecord(decode_npy_file(file_bytes) if cache is None else cache.array(key, lambda: decode_npy_file(file_bytes)))
+    if not filename.endswith(".xml"):
+        return file_bytes if cache is None else cache.blob(key, lambda: file_bytes)
+    if cache is None:
+        return decode_xml_file(filename, file_bytes)
+    record = open_cached_record(cache, key, filename)
+    if record is None:
+        decoded = decode_xml_file(filename, file_bytes)
+        cache.put_array(key, decoded.samples)
+        cache.put_bytes(key, json.dumps(decoded.metadata()).encode("utf-8"))
+        record = open_cached_record(cache, key, filename)
+    return record
+
+
+def decode_upload():
+    """decode(key, filename, file_bytes) for the decode pool, with the shared cache resolved on the script thread."""
+    return functools.partial(decode_file, cache=get_shared_cache())
+
+
+def file_type_of(filename):
+    return "signal" if filename.endswith((".xml", ".npy")) else "visualization"
+
+
+def hold_uploaded_file(uploaded_file):
+    return hold_file(uploaded_file.name, uploaded_file.getvalue())
+
+
+def hold_file(filename, file_bytes):
+    key = content_key(file_bytes)
+    hold_record(key, lambda: decode_file(key, filename, file_bytes, get_shared_cache()))
+    st.session_state["file_type"] = file_type_of(filename)
+    return key
+
+
+@st.cache_resource
+def get_decode_pool():
+    return ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="decode")
+
+
+def queue_uploaded_files(uploaded_files):
+    jobs = st.session_state["decode_jobs"]
+    current = {uploaded_file.file_id for uploaded_file in uploaded_files}
+    for file_id in [file_id for file_id in jobs if file_id not in current]:
+        discard_upload(jobs.pop(file_id))
+    for uploaded_file in uploaded_files:
+        if uploaded_file.file_id not in jobs:
+            args = (
+                get_decode_pool(),
+                get_array_store(),
+                UPLOAD_DIR,
+                uploaded_file.name,
+                uploaded_file.getvalue(),
+                decode_upload(),
+                ARRAY_STORE_HOLDER_TTL,
+            )
+            jobs[uploaded_file.file_id] = submit_upload(*args)
+    return [jobs[uploaded_file.file_id] for uploaded_file in uploaded_files]
+
+
+def render_decode_status(batch):
+    for job in batch:
+        future = job["future"]
+        if not future.done():
+            st.caption(f"⏳ {job['filename']}: decoding")
+        elif future.exception() is not None:
+            st.error(f"{job['filename']}: {future.exception()}")
+        else:
+            st.caption(f"✓ {job['filename']}")
+
+
+def start_next_in_queue():
+    with span("upload_queue.wait"):
+        job = pop_ready(st.session_state["upload_queue"], st.session_state["upload_errors"], hold_record, decode_upload())
+    if job is None:
+        return False
+    st.session_state.update({"file_type": file_type_of(job["filename"]), "current_filename": job["filename"], "file_uploaded": True})
+    start_flow(st.session_state)
+    save_checkpoint()
+    return True
+
+
+def render_upload_errors():
+    # Shown on the page reached after the skip, then dropped so later reruns do not repeat them.
+    for error in st.session_state["upload_errors"]:
+        st.error(f"Skipped {error}")
+    st.session_state["upload_errors"] = []
+
+
+def clear_upload_queue():
+    for job in st.session_state["upload_queue"] + list(st.session_state["decode_jobs"].values()):
+        discard_upload(job)
+    st.session_state.update({"upload_queue": [], "decode_jobs": {}, "upload_errors": []})
+
+
+def start_next_from_worklist():
+    # The scheduler excludes the user's submissions in the current campaign; the session list may predate it.
+    filename = get_scheduler().next_record((), corpus_files(), st.session_state["user_id"])
+    if filename is None:
+        st.info("The worklist is empty.")
+        return
+    try:
+        with open(os.path.join(CORPUS_DIR, filename), "rb") as f:
+            hold_file(filename, f.read())
+    except FileNotFoundError:
+        # Removed since the last listing; list again on the next click.
+        corpus_files.clear()
+        st.warning(f"{filename} is no longer in the corpus. Try again.")
+        return
     st.session_state["current_filename"] = filename
     st.session_state["file_uploaded"] = True
+    start_flow(st.session_state)
+    save_checkpoint()
+    st.rerun()
+
+
+def render_file_upload_page():
+    render_page_header("ECG Annotation", "Upload ECG File")
+    if corpus_files() and st.button("Next from worklist", type="primary", width="stretch"):
+        start_next_from_worklist()
+    if st.session_state["upload_queue"]:
+        remaining = len(st.session_state["upload_queue"])
+        if st.button(f"Continue batch ({remaining} left)", width="stretch"):
+            start_next_in_queue()
+            st.rerun()
+    render_upload_errors()
+    uploaded_files = st.file_uploader(
+        "Upload files",
+        type=["xml", "npy", "png", "pdf"],
+        accept_multiple_files=True,
+        key=f"uploader_{st.session_state['upload_batch']}",
+    )
+    batch = queue_uploaded_files(uploaded_files or [])
+    if not batch:
+        return
+    render_decode_status(batch)
 
     if st.button("Start Annotation", width="stretch"):
-        first_question = get_next_question_key(0, {})
-        if first_question:
-            update_navigation_history(first_question)
+        st.session_state["decode_jobs"] = {}
+        clear_upload_queue()
+        st.session_state["upload_queue"] = batch
+        st.session_state["upload_batch"] += 1
+        start_next_in_queue()
+        st.rerun()
+
+
+def render_resume_upload():
+    filename = st.session_state["current_filename"]
+    expected_key = st.session_state["record_key"]
+    st.warning(f"Your answers for {filename} were saved, but the file is no longer loaded. Upload it again to continue.")
+    uploaded_file = st.file_uploader("Upload the same file", type=["xml", "npy", "png", "pdf"], key="resume_upload")
+    if uploaded_file is not None:
+        if content_key(uploaded_file.getvalue()) == expected_key:
+            st.session_state["record_key"] = None
+            hold_uploaded_file(uploaded_file)
+            st.rerun()
+        st.error("This is not the same file. Upload the original file or start over.")
+    if st.button("Start Over", width="stretch"):
+        clear_checkpoint()
+        reset_session_for_new_file()
         st.rerun()
 
 
@@ -448,131 +849,129 @@ def render_review_page():
         st.write(answers[duration_answer])
 
     def go_back():
-        st.session_state["show_review"] = False
-        history = st.session_state["navigation_history"]
-        if history:
-            history.pop()
-        for followup in DURATION_FOLLOWUPS:
-            if followup in answers:
-                answers.pop(followup, None)
-                st.session_state["current_question_index"] = len(ALL_QUESTION_ORDER)
-                st.rerun()
-                return
-        last_idx = find_last_answered(ALL_QUESTION_ORDER, answers)
-        if last_idx >= 0:
-            answers.pop(ALL_QUESTION_ORDER[last_idx], None)
-            st.session_state["current_question_index"] = last_idx
-        else:
-            st.session_state["current_question_index"] = 0
+        apply_review_back(st.session_state)
+        save_checkpoint()
         st.rerun()
 
     def submit():
-        save_all_responses(answers, st.session_state["current_filename"])
-        filename = st.session_state["current_filename"]
-        if filename not in st.session_state["completed_files"]:
-            st.session_state["completed_files"].append(filename)
-        st.session_state["submission_complete"] = True
+        submit_current_file()
         st.rerun()
 
     render_button_pair("Back", "Submit", go_back, submit)
 
 
-def go_back_to_noise(answers):
-    last_idx = find_last_answered(NOISE_ARTIFACTS_QUESTION_ORDER, answers)
-    if last_idx >= 0:
-        answers.pop(NOISE_ARTIFACTS_QUESTION_ORDER[last_idx], None)
-        return last_idx
-    return 0
+def submit_current_file():
+    save_all_responses(st.session_state["answers"], st.session_state["current_filename"])
+    filename = st.session_state["current_filename"]
+    if filename not in st.session_state["completed_files"]:
+        st.session_state["completed_files"].append(filename)
+    store = get_user_state_store()
+    if store:
+        store.add_completed_file(st.session_state["user_id"], filename)
+    st.session_state["rapid_round"] += 1
+    st.session_state["submission_complete"] = True
+    clear_checkpoint()
 
 
-def handle_back_navigation(question_key):
-    answers = st.session_state["answers"]
-    history = st.session_state["navigation_history"]
+def record_rapid_events(events, filename):
+    event_log = shared_event_log()
+    for question, event, dwell_ms in client_events(events):
+        event_log.record(st.session_state["user_id"], filename, question, event, dwell_ms)
 
-    if history and history[-1] == question_key:
-        history.pop()
-
-    if question_key in DURATION_FOLLOWUPS:
-        answers.pop("Duration", None)
-        st.session_state["current_question_index"] = len(NOISE_ARTIFACTS_QUESTION_ORDER) + QRS_QUESTION_ORDER.index("Duration")
-    elif question_key in T_QUESTION_ORDER:
-        answers.pop(question_key, None)
-        last_qrs_idx = find_last_answered(QRS_QUESTION_ORDER, answers)
-        if last_qrs_idx >= 0:
-            answers.pop(QRS_QUESTION_ORDER[last_qrs_idx], None)
-            st.session_state["current_question_index"] = len(NOISE_ARTIFACTS_QUESTION_ORDER) + last_qrs_idx
-        else:
-            st.session_state["current_question_index"] = go_back_to_noise(answers)
-    elif question_key in QRS_QUESTION_ORDER:
-        answers.pop(question_key, None)
-        qrs_idx = QRS_QUESTION_ORDER.index(question_key)
-        if qrs_idx > 0:
-            answers.pop(QRS_QUESTION_ORDER[qrs_idx - 1], None)
-            st.session_state["current_question_index"] = len(NOISE_ARTIFACTS_QUESTION_ORDER) + qrs_idx - 1
-        else:
-            st.session_state["current_question_index"] = go_back_to_noise(answers)
-    elif question_key in NOISE_LEAD_QUESTIONS:
-        answers.pop(question_key, None)
-        noise_answers = answers.get("Noise artifacts", [])
-        prev_lead_key = None
-        for noise_type, lead_key in NOISE_TO_LEAD_QUESTION.items():
-            if lead_key == question_key:
-                break
-            if noise_type in noise_answers:
-                prev_lead_key = lead_key
-        if prev_lead_key:
-            answers.pop(prev_lead_key, None)
-            st.session_state["current_question_index"] = NOISE_ARTIFACTS_QUESTION_ORDER.index(prev_lead_key)
-        else:
-            answers.pop("Noise artifacts", None)
-            st.session_state["current_question_index"] = 0
-    else:
-        new_index = st.session_state["current_question_index"] - 1
-        if 0 <= new_index < len(NOISE_ARTIFACTS_QUESTION_ORDER):
-            answers.pop(NOISE_ARTIFACTS_QUESTION_ORDER[new_index], None)
-            st.session_state["current_question_index"] = new_index
 
-    st.session_state["navigation_history"] = history
+def render_rapid_annotation():
+    from ecg_annot.components.rapid_annotation import rapid_annotation
+
+    key = f"rapid_{st.session_state['session_id']}_{st.session_state['rapid_round']}"
+    result = rapid_annotation(key=key, answers=st.session_state["answers"], history=st.session_state["navigation_history"])
+    if result is None:
+        return
+    # The component keeps returning its last value on later reruns; progress is applied once per post.
+    if not result.get("final") and (key, result.get("seq")) == st.session_state["rapid_seq"]:
+        return
+    st.session_state["rapid_seq"] = (key, result.get("seq"))
+    answers = result.get("answers", {})
+    if not result.get("final"):
+        st.session_state.update(replay_answers(answers, result.get("history", [])))
+        record_rapid_events(result.get("events"), st.session_state["current_filename"])
+        save_checkpoint()
+        return
+    try:
+        validate_answers(answers)
+    except ValueError as e:
+        st.error(f"Could not submit these answers: {e}")
+        if st.button("Restart Annotation", width="stretch"):
+            st.session_state["rapid_round"] += 1
+            st.rerun()
+        return
+    st.session_state["answers"] = answers
+    st.session_state["navigation_history"] = result.get("history", [])
+    filename = st.session_state["current_filename"]
+    # Events are recorded after the submission is saved so that a bad event payload cannot lose it.
+    submit_current_file()
+    record_rapid_events(result.get("events"), filename)
     st.rerun()
 
 
-def handle_next_navigation(question_key, selected):
-    answers = st.session_state["answers"]
-    answers[question_key] = selected
-    update_navigation_history(question_key)
-    if question_key == "Duration":
-        for opt in DURATION_FOLLOWUPS:
-            answers.pop(opt, None)
-
-    current_idx = get_question_index(question_key)
-    if question_key == "Duration":
-        st.session_state["current_question_index"] = current_idx
-    else:
-        st.session_state["current_question_index"] = current_idx + 1
+def mark_question_shown(question_key):
+    shown = st.session_state["question_shown"]
+    if shown is None or shown[0] != question_key:
+        st.session_state["question_shown"] = (question_key, time.time())
+
+
+def record_question_event(question_key, event):
+    shown = st.session_state["question_shown"]
+    dwell_ms = (time.time() - shown[1]) * 1000 if shown and shown[0] == question_key else None
+    shared_event_log().record(st.session_state["user_id"], st.session_state["current_filename"], question_key, event, dwell_ms)
+    st.session_state["question_shown"] = None
+
+
+def handle_back_navigation(question_key):
+    record_question_event(question_key, "back")
+    apply_back(st.session_state, question_key)
+    save_checkpoint()
+    st.rerun()
 
-    next_key = get_next_question_key(st.session_state["current_question_index"], answers)
-    if next_key:
-        update_navigation_history(next_key)
-    else:
-        st.session_state["show_review"] = True
 
+def handle_next_navigation(question_key, selected):
+    try:
+        validate_answer(question_key, selected)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    record_question_event(question_key, "answer")
+    apply_next(st.session_state, question_key, selected)
+    save_checkpoint()
     st.rerun()
 
 
 def render_questions_page():
     render_page_header("ECG Annotation")
     file_type = st.session_state.get("file_type")
+    record = get_held_record()
+    if file_type is not None and record is None:
+        render_resume_upload()
+        return
+    render_upload_errors()
     if file_type == "signal":
-        ecg_data = st.session_state["ecg_data"]
-        if ecg_data is not None:
-            selected_leads = render_lead_selection()
-            st.session_state["selected_leads"] = selected_leads
-            render_ecg_plot(ecg_data, selected_leads)
+        selected_leads = render_lead_selection()
+        st.session_state["selected_leads"] = selected_leads
+        start, stop = render_timeline(record)
+        render_ecg_plot(record, selected_leads, start, stop)
     elif file_type == "visualization":
-        visualization_data = st.session_state.get("visualization_data")
         filename = st.session_state.get("current_filename")
-        if visualization_data is not None and filename:
-            render_visualization(visualization_data, filename)
+        if filename:
+            render_visualization(record, filename)
+
+    st.toggle(
+        "Rapid keyboard mode",
+        key="rapid_mode",
+        on_change=save_checkpoint,
+        help="Answer with number keys; progress is saved as you go and the answers are checked on submit.",
+    )
+    if st.session_state["rapid_mode"]:
+        render_rapid_annotation()
+        return
 
     left_col, right_col = st.columns([3, 2])
     with left_col:
@@ -581,11 +980,12 @@ def render_questions_page():
         if st.session_state["show_review"]:
             render_review_page()
         else:
-            question_key = get_next_question_key(st.session_state["current_question_index"], st.session_state["answers"])
+            question_key = current_question_key(st.session_state)
             if question_key is None:
                 st.session_state["show_review"] = True
                 st.rerun()
             else:
+                mark_question_shown(question_key)
                 question_data = ALL_QUESTIONS_GRAPH[question_key]
                 st.markdown("### Question")
                 st.markdown(
@@ -613,7 +1013,7 @@ def render_questions_page():
         st.markdown("</div>", unsafe_allow_html=True)
     with right_col:
         if st.session_state["show_graph"] and not st.session_state["show_review"]:
-            question_key = get_next_question_key(st.session_state["current_question_index"], st.session_state["answers"])
+            question_key = current_question_key(st.session_state)
             current_key = question_key or list(ALL_QUESTIONS_GRAPH.keys())[0]
             st.markdown("### Question Graph")
 
@@ -639,9 +1039,19 @@ def render_completion_page():
     render_page_header("Submission Complete")
     st.success("Thank you for your submission.")
     st.write("Would you like to upload another file?")
+    render_upload_errors()
+    queue = st.session_state["upload_queue"]
+    keep_spooled(queue)
+    if queue and st.button(f"Next in batch: {queue[0]['filename']} ({len(queue)} left)", type="primary", width="stretch"):
+        reset_session_for_new_file()
+        start_next_in_queue()
+        st.rerun()
     if st.button("Upload Another File", width="stretch"):
         reset_session_for_new_file()
         st.rerun()
+    if corpus_files() and st.button("Next from worklist", type="primary", width="stretch"):
+        reset_session_for_new_file()
+        start_next_from_worklist()
 
 
 def render_guest_page():
@@ -672,41 +1082,185 @@ def render_admin_login():
 
 def render_reset_button():
     if st.session_state.get("reset_confirmed"):
-        st.warning("⚠️ Are you sure you want to delete ALL data? This cannot be undone.")
+        st.warning("Start a new campaign? Current responses are archived to a snapshot and stay available in the campaign list.")
 
         def cancel():
             st.session_state["reset_confirmed"] = False
             st.rerun()
 
         def confirm():
-            reset_database()
+            archive_campaign()
             st.session_state["reset_confirmed"] = False
-            st.success("Database reset successfully.")
+            st.session_state.pop("admin_campaign", None)
             st.rerun()
 
-        render_button_pair("Cancel", "Confirm Reset", cancel, confirm)
+        render_button_pair("Cancel", "Confirm New Campaign", cancel, confirm)
     else:
-        if st.button("Reset Database", type="secondary", width="stretch"):
+        if st.button("Archive and Start New Campaign", type="secondary", width="stretch"):
             st.session_state["reset_confirmed"] = True
             st.rerun()
 
 
+def describe_campaign(campaign):
+    if campaign["archived_at"] is None:
+        return f"Campaign {campaign['id']} (active since {campaign['started_at']})"
+    if campaign["snapshot"]:
+        status = "snapshot ready"
+    elif campaign["snapshot_error"]:
+        status = f"snapshot failed, retrying: {campaign['snapshot_error']}"
+    else:
+        status = "snapshot in progress"
+    return f"Campaign {campaign['id']} (archived {campaign['archived_at']}, {status})"
+
+
 def render_admin_page():
     st.title("Admin Panel")
-    df = load_all_users()
+    if not st.session_state.get("snapshots_resumed"):
+        resume_pending_snapshots()
+        st.session_state["snapshots_resumed"] = True
+    campaigns = {c["id"]: c for c in get_campaign_store().campaigns()}
+    if st.session_state.get("admin_campaign") not in campaigns:
+        st.session_state["admin_campaign"] = next(iter(campaigns))
+    campaign = campaigns[st.selectbox("Campaign", list(campaigns), format_func=lambda i: describe_campaign(campaigns[i]), key="admin_campaign")]
+    df = load_all_users(campaign)
     if not df.empty:
         st.subheader("All user data")
         st.dataframe(df, width="stretch")
-        st.download_button("Download CSV", df.to_csv(index=False).encode("utf-8"), "responses.csv", "text/csv")
+        st.download_button("Download CSV", df.to_csv(index=False).encode("utf-8"), f"responses_campaign_{campaign['id']}.csv", "text/csv")
     else:
         st.info("No responses yet.")
     st.divider()
+    render_corpus_browser(df, campaign)
+    st.divider()
+    render_validation_panel(df, campaign)
+    st.divider()
+    render_time_on_task_panel()
+    st.divider()
+    render_performance_panel()
+    st.divider()
     render_reset_button()
     if st.button("Back to Portal"):
-        st.session_state.update({"role": None, "reset_confirmed": False})
+        st.session_state.update({"role": None, "reset_confirmed": False, "snapshots_resumed": False})
         st.rerun()
 
 
+CORPUS_PAGE_SIZE = 50
+
+
+def render_corpus_browser(records_df, campaign):
+    import pandas as pd
+
+    st.subheader("Corpus")
+    active = campaign["archived_at"] is None
+    if not active:
+        index = get_archived_corpus_index(campaign["id"])
+    else:
+        index = get_corpus_index()
+        if st.button("Rebuild index") or (index.is_empty() and not records_df.empty):
+            with span("corpus_index.rebuild"):
+                records = records_df.to_dict("records")
+                corpus_files.clear()
+                index.rebuild(records, corpus_files())
+                get_scheduler().backfill(records)
+
+    counts = index.status_counts()
+    for col, (status, count) in zip(st.columns(len(counts)), counts.items()):
+        col.metric(status.title(), f"{count:,}")
+
+    search_col, status_col, min_col = st.columns([2, 2, 1])
+    search = search_col.text_input("Filename contains", key="corpus_search")
+    statuses = status_col.multiselect("Agreement", AGREEMENT_STATUSES, key="corpus_statuses")
+    min_annotators = min_col.number_input("Min annotators", min_value=0, step=1, key="corpus_min_annotators")
+    sort_col, order_col, page_col = st.columns([2, 1, 1], vertical_alignment="bottom")
+    sort = sort_col.selectbox("Sort by", SORT_COLUMNS, index=SORT_COLUMNS.index("last_updated"), key="corpus_sort")
+    descending = order_col.toggle("Descending", value=True, key="corpus_descending")
+    page = page_col.number_input("Page", min_value=1, step=1, key="corpus_page")
+
+    with span("corpus_index.query"):
+        rows, total = index.query(search, statuses, int(min_annotators), sort, descending, CORPUS_PAGE_SIZE, (page - 1) * CORPUS_PAGE_SIZE)
+    pages = max((total + CORPUS_PAGE_SIZE - 1) // CORPUS_PAGE_SIZE, 1)
+    st.caption(f"{total:,} files match · page {page} of {pages:,}")
+    if rows:
+        st.dataframe(pd.DataFrame(rows), width="stretch", hide_index=True)
+    if not active:
+        return
+
+    st.markdown("**Worklist**")
+    st.caption("Next files served by “Next from worklist” and `/records/next`, highest score first.")
+    worklist = get_scheduler().top()
+    if worklist:
+        st.dataframe(pd.DataFrame(worklist), width="stretch", hide_index=True)
+
+
+def render_validation_panel(records_df, campaign):
+    st.subheader("Consistency check")
+    st.caption("Flags stored answers the question flow could not have produced, and annotations with unanswered questions.")
+    if not st.button("Validate responses"):
+        return
+    with span("validate_responses"):
+        issues = validate_records(records_df.to_dict("records"))
+    if issues.empty:
+        st.success("All stored annotations are consistent.")
+        return
+    counts = summarize(issues)
+    for col, (issue, count) in zip(st.columns(len(counts)), counts.items()):
+        col.metric(issue.replace("_", " ").capitalize(), f"{count:,}")
+    st.dataframe(issues, width="stretch", hide_index=True)
+    st.download_button("Download issues", issues.to_csv(index=False).encode("utf-8"), f"issues_campaign_{campaign['id']}.csv", "text/csv")
+
+
+def render_time_on_task_panel():
+    import pandas as pd
+
+    st.subheader("Time on task")
+    aggregates = shared_event_log().aggregates()
+    if not aggregates:
+        st.info("No question events recorded yet.")
+        return
+    df = pd.DataFrame(aggregates)
+    df.insert(1, "text", df["question"].map(lambda key: ALL_QUESTIONS_GRAPH.get(key, {}).get("question", key)))
+    st.caption("Sorted by total annotator time; back_rate is back-navigations per answer.")
+    st.dataframe(df.round(2), width="stretch", hide_index=True)
+
+
+def hit_rate(hits, misses):
+    total = hits + misses
+    return f"{hits / total:.0%}" if total else "n/a"
+
+
+def render_performance_panel():
+    import numpy as np
+    import pandas as pd
+
+    st.subheader("Performance (this worker)")
+    summary = METRICS.summary()
+    if not summary:
+        st.info("No timings recorded yet.")
+    else:
+        st.dataframe(pd.DataFrame(summary).round(2), width="stretch", hide_index=True)
+        name = st.selectbox("Latency histogram", [row["span"] for row in summary])
+        recent_ms = np.asarray(METRICS.recent(name)) * 1000
+        bounds_ms = [b * 1000 for b in BUCKETS_S]
+        counts = np.bincount(np.searchsorted(bounds_ms, recent_ms), minlength=len(bounds_ms) + 1)
+        labels = [f"≤{b:g} ms" for b in bounds_ms] + [f">{bounds_ms[-1]:g} ms"]
+        st.bar_chart(pd.DataFrame({"requests": counts}, index=pd.CategoricalIndex(labels, categories=labels, ordered=True)))
+
+    store_stats = get_array_store().stats()
+    counters = dict(METRICS.counters)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Record store hit rate", hit_rate(store_stats["hits"], store_stats["misses"]))
+    col1.caption(
+        f"{store_stats['entries']} records, {store_stats['nbytes'] / 2**20:.1f} MiB of {store_stats['max_bytes'] / 2**20:.0f} MiB, "
+        f"{store_stats['mapped_nbytes'] / 2**20:.1f} MiB of {store_stats['max_mapped_bytes'] / 2**20:.0f} MiB mapped"
+    )
+    col2.metric("Shared cache hit rate", hit_rate(counters.get("shared_cache.hit", 0), counters.get("shared_cache.miss", 0)))
+    backend_calls = {row["span"]: row["count"] for row in summary if row["span"].startswith("backend.")}
+    col3.metric("Backend calls", int(sum(backend_calls.values())))
+    if backend_calls:
+        col3.caption(", ".join(f"{k.removeprefix('backend.')}: {v}" for k, v in backend_calls.items()))
+    st.download_button("Download OpenMetrics", METRICS.render_openmetrics().encode("utf-8"), "metrics.txt", "text/plain")
+
+
 def render_landing():
     st.title("Portal")
     st.markdown('<p class="portal-choose">Choose mode:</p>', unsafe_allow_html=True)
@@ -0,0 +1,112 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+LAUNCH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "launch.py")
+
+NGINX_TEMPLATE = """pid {state_dir}/nginx.pid;
+error_log {state_dir}/nginx_error.log;
+events {{}}
+
+http {{
+    access_log off;
+
+    upstream ecg_annot {{
+        ip_hash;
+{servers}
+    }}
+
+    map $http_upgrade $connection_upgrade {{
+        default upgrade;
+        '' close;
+    }}
+
+    server {{
+        listen {port};
+        client_max_body_size 200m;
+        location / {{
+            proxy_pass http://ecg_annot;
+            proxy_http_version 1.1;
+            proxy_set_header Upgrade $http_upgrade;
+            proxy_set_header Connection $connection_upgrade;
+            proxy_set_header Host $host;
+            proxy_read_timeout 86400;
+        }}
+    }}
+}}
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run several ECG annotation workers sharing one state directory.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--base-port", type=int, default=8501)
+    parser.add_argument("--proxy-port", type=int, default=8500, help="Port written into the generated nginx config")
+    parser.add_argument("--state-dir", default=".ecg_annot")
+    parser.add_argument("--backend", choices=["sheets", "sqlite"], default="sheets")
+    parser.add_argument("--responses-db", default="responses.db")
+    return parser.parse_args()
+
+
+def write_nginx_conf(state_dir, ports, proxy_port):
+    servers = "\n".join(f"        server 127.0.0.1:{port};" for port in ports)
+    path = os.path.join(state_dir, "nginx.conf")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(NGINX_TEMPLATE.format(state_dir=state_dir, servers=servers, port=proxy_port))
+    return path
+
+
+def start_worker(port, env):
+    cmd = [
+        sys.executable,
+        "-m",
+        "streamlit",
+        "run",
+        LAUNCH_PATH,
+        "--server.port",
+        str(port),
+        "--server.headless",
+        "true",
+    ]
+    return subprocess.Popen(cmd, env=env)
+
+
+def main():
+    args = parse_args()
+    state_dir = os.path.abspath(args.state_dir)
+    os.makedirs(state_dir, exist_ok=True)
+    env = dict(
+        os.environ,
+        ECG_ANNOT_DEPLOYMENT="multi",
+        ECG_ANNOT_STATE_DIR=state_dir,
+        ECG_ANNOT_RESPONSE_BACKEND=args.backend,
+        ECG_ANNOT_RESPONSES_DB=os.path.abspath(args.responses_db),
+    )
+    ports = [args.base_port + i for i in range(args.workers)]
+    workers = [start_worker(port, env) for port in ports]
+    conf_path = write_nginx_conf(state_dir, ports, args.proxy_port)
+    print(f"Started {len(workers)} workers on ports {', '.join(map(str, ports))}")
+    print(f"Sticky-session nginx config: {conf_path} (run: nginx -c {conf_path})")
+
+    def stop(*_):
+        for proc in workers:
+            proc.terminate()
+        for proc in workers:
+            proc.wait()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    while True:
+        for i, proc in enumerate(workers):
+            if proc.poll() is not None:
+                print(f"Worker on port {ports[i]} exited with code {proc.returncode}, restarting")
+                workers[i] = start_worker(ports[i], env)
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
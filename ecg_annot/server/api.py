@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+import tornado.log
+import tornado.web
+
+from ecg_annot.configs.annotation import ALL_QUESTIONS_GRAPH, PTB_ORDER
+from ecg_annot.configs.server import (
+    API_PORT,
+    ARRAY_STORE_HOLDER_TTL,
+    ARRAY_STORE_MAX_BYTES,
+    ARRAY_STORE_MAX_MAPPED_BYTES,
+    CORPUS_DIR,
+    CORPUS_SYNC_SECONDS,
+    MODEL_SCORES,
+    TARGET_ANNOTATORS,
+    RESPONSE_BACKEND,
+    RESPONSES_DB,
+    SERVICE_ACCOUNT_FILE,
+    SHEET_ID,
+    STATE_DB,
+    METRICS_FILE,
+)
+from ecg_annot.data_utils.records import load_ecg_record
+from ecg_annot.flow import apply_back, apply_next, apply_review_back, current_question_key, new_flow_state, start_flow, validate_answer
+from ecg_annot.server.array_store import ArrayStore, content_key
+from ecg_annot.server.campaigns import DEFAULT_PARTITION, CampaignStore
+from ecg_annot.server.corpus_index import CorpusIndex
+from ecg_annot.server.events import EventLog, shared_event_log
+from ecg_annot.server.metrics import METRICS, InstrumentedWorksheet, span, start_file_exporter
+from ecg_annot.server.responses import save_responses
+from ecg_annot.server.scheduler import Scheduler, default_scorers
+from ecg_annot.server.sqlite_sheet import SqliteWorksheet
+from ecg_annot.server.user_state import UserStateStore
+
+SIGNAL_EXTENSIONS = (".xml", ".npy")
+
+
+def open_worksheet(partition: str = DEFAULT_PARTITION):
+    if RESPONSE_BACKEND == "sqlite":
+        return SqliteWorksheet(RESPONSES_DB, partition)
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=["https://www.googleapis.com/auth/spreadsheets"])
+    spreadsheet = gspread.authorize(creds).open_by_key(SHEET_ID)
+    return spreadsheet.sheet1 if partition == DEFAULT_PARTITION else spreadsheet.worksheet(partition)
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+class AnnotationService:
+    def __init__(
+        self,
+        corpus_dir: str,
+        worksheet_factory: Callable[[], Any],
+        user_state: UserStateStore,
+        array_store: ArrayStore,
+        event_log: EventLog | None = None,
+        corpus_index: CorpusIndex | None = None,
+        scheduler: Scheduler | None = None,
+        campaigns: CampaignStore | None = None,
+    ):
+        self.corpus_dir = corpus_dir
+        self.worksheet_factory = worksheet_factory
+        self.user_state = user_state
+        self.array_store = array_store
+        self.event_log = event_log
+        self.corpus_index = corpus_index
+        self.scheduler = scheduler
+        self.campaigns = campaigns
+        self._records: Dict[str, None] = {}
+        self._records_listed_at = float("-inf")
+        if scheduler is not None:
+            self.list_records()
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        # save_responses rewrites the user's whole row, so one user's submissions are saved one at a time.
+        self._user_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._user_locks_lock = threading.Lock()
+        self._worksheets: Dict[str | None, Any] = {}
+
+    def worksheet(self):
+        partition = self.campaigns.active()["partition"] if self.campaigns is not None else None
+        if partition not in self._worksheets:
+            ws = self.worksheet_factory() if partition is None else self.worksheet_factory(partition)
+            self._worksheets[partition] = InstrumentedWorksheet(ws)
+        return self._worksheets[partition]
+
+    def list_records(self):
+        """Corpus filenames, re-listed at most every CORPUS_SYNC_SECONDS; new files join the worklist on each listing."""
+        if time.monotonic() - self._records_listed_at >= CORPUS_SYNC_SECONDS:
+            self._records = dict.fromkeys(sorted(f for f in os.listdir(self.corpus_dir) if f.endswith(SIGNAL_EXTENSIONS)))
+            self._records_listed_at = time.monotonic()
+            if self.scheduler is not None:
+                self.scheduler.add_files(self._records)
+        return self._records.keys()
+
+    def _expire_sessions(self) -> None:
+        # Clients that never submit leave their session behind; drop it once the store would expire its hold.
+        cutoff = time.monotonic() - self.array_store.holder_ttl
+        for session_id, session in list(self.sessions.items()):
+            if session["touched"] < cutoff:
+                self.close(session_id)
+
+    def next_record(self, user_id: str) -> str | None:
+        self._expire_sessions()
+        done = set(self.user_state.completed_files(user_id))
+        done.update(s["filename"] for s in self.sessions.values() if s["user_id"] == user_id)
+        if self.scheduler is not None:
+            return self.scheduler.next_record(done, self.list_records(), user_id)
+        return next((f for f in self.list_records() if f not in done), None)
+
+    def _load(self, filename: str, holder: str):
+        path = os.path.join(self.corpus_dir, os.path.basename(filename))
+        try:
+            with open(path, "rb") as f:
+                key = content_key(f.read())
+        except FileNotFoundError:
+            raise LookupError(f"No such record: {filename}")
+
+        def decode():
+            with span(f"decode{os.path.splitext(filename)[1]}"):
+                return load_ecg_record(path)
+
+        return key, self.array_store.acquire(key, holder, decode)
+
+    def open_session(self, user_id: str, filename: str | None = None) -> Dict[str, Any]:
+        self._expire_sessions()
+        filename = filename or self.next_record(user_id)
+        if filename is None:
+            raise LookupError("No records left to annotate")
+        session_id = str(uuid.uuid4())
+        record_key, ecg_data = self._load(filename, session_id)
+        state = new_flow_state()
+        start_flow(state)
+        self.sessions[session_id] = {
+            "user_id": user_id,
+            "filename": filename,
+            "record_key": record_key,
+            "state": state,
+            "shown": None,
+            "touched": time.monotonic(),
+        }
+        return {
+            "session_id": session_id,
+            "filename": filename,
+            "shape": list(ecg_data.shape),
+            "sample_rate": ecg_data.sample_rate,
+            **self.question(session_id),
+        }
+
+    def get_session(self, session_id: str) -> Dict[str, Any]:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        session["touched"] = time.monotonic()
+        return session
+
+    def signal(self, session_id: str, start: int = 0, stop: int | None = None, leads: List[str] | None = None) -> Dict[str, Any]:
+        session = self.get_session(session_id)
+        leads = leads or PTB_ORDER
+        unknown = [lead for lead in leads if lead not in PTB_ORDER]
+        if unknown:
+            raise ValueError(f"Unknown leads: {unknown}")
+        ecg_data = self.array_store.get(session["record_key"], session_id)
+        if ecg_data is None:
+            # Evicted while the session was idle past the holder TTL; decode it again under the same hold.
+            session["record_key"], ecg_data = self._load(session["filename"], session_id)
+        with span("decode.window"):
+            window = ecg_data.window(leads, start, stop)
+        return {lead: window[i].tolist() for i, lead in enumerate(leads)}
+
+    def record_event(self, session: Dict[str, Any], question_key: str, event: str) -> None:
+        shown = session["shown"]
+        session["shown"] = None
+        if self.event_log is None:
+            return
+        dwell_ms = (time.time() - shown[1]) * 1000 if shown and shown[0] == question_key else None
+        self.event_log.record(session["user_id"], session["filename"], question_key, event, dwell_ms)
+
+    def question(self, session_id: str) -> Dict[str, Any]:
+        session = self.get_session(session_id)
+        state = session["state"]
+        key = None if state["show_review"] else current_question_key(state)
+        if key is None:
+            return {"question": None, "review": True, "answers": state["answers"]}
+        if session["shown"] is None or session["shown"][0] != key:
+            session["shown"] = (key, time.time())
+        data = ALL_QUESTIONS_GRAPH[key]
+        question = {"key": key, "text": data["question"], "choices": data["choices"], "multilabel": bool(data.get("multilabel"))}
+        return {"question": question, "review": False, "answers": state["answers"]}
+
+    def answer(self, session_id: str, question_key: str, selected: Any) -> Dict[str, Any]:
+        session = self.get_session(session_id)
+        state = session["state"]
+        expected = None if state["show_review"] else current_question_key(state)
+        if question_key != expected:
+            raise ValueError(f"Expected an answer for {expected!r}, got {question_key!r}")
+        validate_answer(question_key, selected)
+        self.record_event(session, question_key, "answer")
+        apply_next(state, question_key, selected)
+        return self.question(session_id)
+
+    def back(self, session_id: str) -> Dict[str, Any]:
+        session = self.get_session(session_id)
+        state = session["state"]
+        if state["show_review"]:
+            apply_review_back(state)
+        else:
+            question_key = current_question_key(state)
+            self.record_event(session, question_key, "back")
+            apply_back(state, question_key)
+        return self.question(session_id)
+
+    def submit(self, session_id: str) -> Dict[str, Any]:
+        session = self.get_session(session_id)
+        state = session["state"]
+        if current_question_key(state) is not None:
+            raise ValueError("Annotation is incomplete")
+        with self._user_locks_lock:
+            user_lock = self._user_locks[session["user_id"]]
+        with user_lock:
+            file_data = save_responses(self.worksheet(), session["user_id"], session["filename"], state["answers"])
+            if self.corpus_index is not None:
+                self.corpus_index.record_submission(session["user_id"], session["filename"], file_data)
+            if self.scheduler is not None:
+                self.scheduler.record_submission(session["user_id"], session["filename"], file_data)
+        self.user_state.add_completed_file(session["user_id"], session["filename"])
+        self.close(session_id)
+        return {"submitted": session["filename"]}
+
+    def close(self, session_id: str) -> None:
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self.array_store.release(session["record_key"], session_id)
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service: AnnotationService):
+        self.service = service
+
+    def json_body(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError as e:
+            raise tornado.web.HTTPError(400, reason=f"Invalid JSON: {e}")
+
+    async def call(self, fn, *args, blocking=False):
+        try:
+            if blocking:
+                result = await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+            else:
+                result = fn(*args)
+        except SessionNotFound:
+            raise tornado.web.HTTPError(404, reason="Unknown session")
+        except LookupError as e:
+            raise tornado.web.HTTPError(404, reason=str(e))
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+        self.write(result)
+
+
+class NextRecordHandler(BaseHandler):
+    async def get(self):
+        user_id = self.get_query_argument("user_id")
+        await self.call(lambda: {"filename": self.service.next_record(user_id)})
+
+
+class SessionsHandler(BaseHandler):
+    async def post(self):
+        body = self.json_body()
+        if "user_id" not in body:
+            raise tornado.web.HTTPError(400, reason="user_id is required")
+        await self.call(self.service.open_session, body["user_id"], body.get("filename"), blocking=True)
+
+
+class SignalHandler(BaseHandler):
+    async def get(self, session_id):
+        start = self.get_query_argument("start", "0")
+        stop = self.get_query_argument("stop", None)
+        leads = self.get_query_argument("leads", None)
+
+        def signal():
+            # int() inside call() so that a non-numeric start/stop is a 400.
+            return self.service.signal(session_id, int(start), int(stop) if stop is not None else None, leads.split(",") if leads else None)
+
+        await self.call(signal)
+
+
+class QuestionHandler(BaseHandler):
+    async def get(self, session_id):
+        await self.call(self.service.question, session_id)
+
+
+class AnswerHandler(BaseHandler):
+    async def post(self, session_id):
+        body = self.json_body()
+        if "key" not in body or "answer" not in body:
+            raise tornado.web.HTTPError(400, reason="key and answer are required")
+        await self.call(self.service.answer, session_id, body["key"], body["answer"])
+
+
+class BackHandler(BaseHandler):
+    async def post(self, session_id):
+        await self.call(self.service.back, session_id)
+
+
+class SubmitHandler(BaseHandler):
+    async def post(self, session_id):
+        await self.call(self.service.submit, session_id, blocking=True)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+        self.write(METRICS.render_openmetrics())
+
+
+def log_request(handler: tornado.web.RequestHandler) -> None:
+    if handler.get_status() < 400:
+        METRICS.observe(f"api.{type(handler).__name__}", handler.request.request_time())
+    else:
+        tornado.log.access_log.warning("%d %s %s", handler.get_status(), handler.request.method, handler.request.uri)
+
+
+def make_app(service: AnnotationService) -> tornado.web.Application:
+    args = {"service": service}
+    return tornado.web.Application(
+        [
+            (r"/records/next", NextRecordHandler, args),
+            (r"/sessions", SessionsHandler, args),
+            (r"/sessions/([\w-]+)/signal", SignalHandler, args),
+            (r"/sessions/([\w-]+)/question", QuestionHandler, args),
+            (r"/sessions/([\w-]+)/answer", AnswerHandler, args),
+            (r"/sessions/([\w-]+)/back", BackHandler, args),
+            (r"/sessions/([\w-]+)/submit", SubmitHandler, args),
+            (r"/metrics", MetricsHandler),
+        ],
+        log_function=log_request,
+    )
+
+
+def make_service(corpus_dir: str = CORPUS_DIR) -> AnnotationService:
+    os.makedirs(os.path.dirname(STATE_DB), exist_ok=True)
+    return AnnotationService(
+        corpus_dir,
+        open_worksheet,
+        UserStateStore(STATE_DB),
+        ArrayStore(ARRAY_STORE_MAX_BYTES, ARRAY_STORE_HOLDER_TTL, ARRAY_STORE_MAX_MAPPED_BYTES),
+        shared_event_log(),
+        CorpusIndex(STATE_DB),
+        Scheduler(STATE_DB, default_scorers(MODEL_SCORES, TARGET_ANNOTATORS)),
+        CampaignStore(STATE_DB),
+    )
+
+
+async def serve(port: int, corpus_dir: str):
+    if METRICS_FILE:
+        start_file_exporter(METRICS_FILE)
+    make_app(make_service(corpus_dir)).listen(port)
+    print(f"Annotation API listening on :{port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless ECG annotation API.")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--corpus-dir", default=CORPUS_DIR)
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.corpus_dir))
+
+
+if __name__ == "__main__":
+    main()
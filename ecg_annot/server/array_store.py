@@ -0,0 +1,172 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+from ecg_annot.configs.server import ARRAY_STORE_HOLDER_TTL, ARRAY_STORE_MAX_BYTES, ARRAY_STORE_MAX_MAPPED_BYTES
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def content_key(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def _freeze(value: Any) -> Any:
+    if hasattr(value, "freeze"):
+        value.freeze()
+    elif hasattr(value, "flags"):
+        value.flags.writeable = False
+    return value
+
+
+def _sizes(value: Any) -> Tuple[int, int]:
+    """(heap bytes, memory-mapped bytes) of a value.
+
+    Mapped bytes live in the page cache rather than this process's heap, but each mapping keeps its
+    file's disk space allocated after the shared cache unlinks it, so they have a budget of their own.
+    """
+    if isinstance(value, np.memmap):
+        return 0, int(value.nbytes)
+    nbytes = getattr(value, "nbytes", None)
+    return int(nbytes) if nbytes is not None else len(value), int(getattr(value, "mapped_nbytes", 0))
+
+
+class ArrayStore:
+    def __init__(self, max_bytes: int, holder_ttl: float, max_mapped_bytes: int | None = None):
+        self.max_bytes = max_bytes
+        self.max_mapped_bytes = max_bytes if max_mapped_bytes is None else max_mapped_bytes
+        self.holder_ttl = holder_ttl
+        self.nbytes = 0
+        self.mapped_nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._sizes: Dict[str, Tuple[int, int]] = {}
+        self._holders: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _touch(self, key: str, holder: str) -> Any:
+        self._entries.move_to_end(key)
+        self._holders.setdefault(key, {})[holder] = time.monotonic()
+        # Records decode leads on demand, so their size is taken again whenever they are handed out.
+        value = self._entries[key]
+        heap, mapped = self._sizes[key]
+        self._sizes[key] = now = _sizes(value)
+        self.nbytes += now[0] - heap
+        self.mapped_nbytes += now[1] - mapped
+        self._evict()
+        return value
+
+    def get(self, key: str, holder: str) -> Any | None:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            return self._touch(key, holder)
+
+    def acquire(self, key: str, holder: str, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._touch(key, holder)
+            self.misses += 1
+        value = _freeze(loader())
+        with self._lock:
+            if key not in self._entries:
+                self._add(key, value)
+            return self._touch(key, holder)
+
+    def _add(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._sizes[key] = heap, mapped = _sizes(value)
+        self.nbytes += heap
+        self.mapped_nbytes += mapped
+
+    def _remove(self, key: str) -> None:
+        del self._entries[key]
+        heap, mapped = self._sizes.pop(key)
+        self.nbytes -= heap
+        self.mapped_nbytes -= mapped
+
+    def _over_budget(self) -> bool:
+        return self.nbytes > self.max_bytes or self.mapped_nbytes > self.max_mapped_bytes
+
+    def put(self, key: str, value: Any) -> None:
+        """Add an entry nobody holds yet, e.g. a record decoded ahead of use; it is evicted like any unheld entry."""
+        value = _freeze(value)
+        with self._lock:
+            if key not in self._entries:
+                self._add(key, value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def release(self, key: str | None, holder: str) -> None:
+        if key is None:
+            return
+        with self._lock:
+            holders = self._holders.get(key)
+            if holders is not None:
+                holders.pop(holder, None)
+                if not holders:
+                    del self._holders[key]
+            self._evict()
+
+    def refcount(self, key: str) -> int:
+        with self._lock:
+            return len(self._holders.get(key, {}))
+
+    def _expire_holders(self) -> None:
+        # Streamlit has no session-end hook, so holders that stop touching an entry expire.
+        cutoff = time.monotonic() - self.holder_ttl
+        for key in list(self._holders):
+            holders = {h: t for h, t in self._holders[key].items() if t >= cutoff}
+            if holders:
+                self._holders[key] = holders
+            else:
+                del self._holders[key]
+
+    def _evict(self) -> None:
+        if not self._over_budget():
+            return
+        self._expire_holders()
+        for key in list(self._entries):
+            if not self._over_budget():
+                break
+            if key in self._holders:
+                continue
+            heap, mapped = self._sizes[key]
+            if (heap and self.nbytes > self.max_bytes) or (mapped and self.mapped_nbytes > self.max_mapped_bytes):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "nbytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "mapped_nbytes": self.mapped_nbytes,
+                "max_mapped_bytes": self.max_mapped_bytes,
+                "held": len(self._holders),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def shared_array_store() -> ArrayStore:
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ArrayStore(ARRAY_STORE_MAX_BYTES, ARRAY_STORE_HOLDER_TTL, ARRAY_STORE_MAX_MAPPED_BYTES)
+        return _shared_store
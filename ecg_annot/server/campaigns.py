@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from ecg_annot.server.sqlite_sheet import HEADER, connect
+
+DEFAULT_PARTITION = "users"
+SNAPSHOT_CHUNK_ROWS = 500
+SNAPSHOT_COLUMNS = ["campaign", "user_id", "created_at", "filename", "updated_at", "question", "answer"]
+
+logger = logging.getLogger(__name__)
+
+
+class CampaignStore:
+    """Annotation campaigns, each writing to its own response partition (SQLite table or worksheet tab).
+
+    Starting a campaign only switches the active partition; the previous one is left in place and
+    snapshotted to Parquet afterwards. A campaign row without started_at is one whose partition is
+    still being created.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS campaigns (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "partition TEXT NOT NULL, started_at TEXT, archived_at TEXT, snapshot TEXT, snapshot_error TEXT)"
+            )
+            if "snapshot_error" not in {row[1] for row in conn.execute("PRAGMA table_info(campaigns)")}:
+                conn.execute("ALTER TABLE campaigns ADD COLUMN snapshot_error TEXT")
+            if conn.execute("SELECT 1 FROM campaigns LIMIT 1").fetchone() is None:
+                conn.execute("INSERT INTO campaigns (partition, started_at) VALUES (?, ?)", (DEFAULT_PARTITION, _now()))
+
+    def _rows(self, where: str = "", params: Tuple = ()) -> List[Dict[str, Any]]:
+        with connect(self.db_path) as conn:
+            conn.row_factory = lambda cursor, row: {col[0]: value for col, value in zip(cursor.description, row)}
+            columns = "id, partition, started_at, archived_at, snapshot, snapshot_error"
+            return conn.execute(f"SELECT {columns} FROM campaigns {where} ORDER BY id DESC", params).fetchall()
+
+    def active(self) -> Dict[str, Any]:
+        return self._rows("WHERE archived_at IS NULL AND started_at IS NOT NULL")[0]
+
+    def campaigns(self) -> List[Dict[str, Any]]:
+        return self._rows("WHERE started_at IS NOT NULL")
+
+    def get(self, campaign_id: int) -> Dict[str, Any]:
+        return self._rows("WHERE id = ?", (campaign_id,))[0]
+
+    def start_next(self, create_partition: Callable[[str], None] | None = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Archive the active campaign and open a new one; the switch only commits once the new partition exists.
+
+        The partition is created outside any transaction: with Sheets it is a network call, and state.db's
+        write lock is shared with every worker's checkpoint and event writes.
+        """
+        with connect(self.db_path) as conn:
+            new_id = conn.execute("INSERT INTO campaigns (partition) VALUES ('')").lastrowid
+            partition = f"{DEFAULT_PARTITION}_{new_id}"
+            conn.execute("UPDATE campaigns SET partition = ? WHERE id = ?", (partition, new_id))
+        try:
+            if create_partition is not None:
+                create_partition(partition)
+        except BaseException:
+            with connect(self.db_path) as conn:
+                conn.execute("DELETE FROM campaigns WHERE id = ?", (new_id,))
+            raise
+        with connect(self.db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            active = "SELECT id FROM campaigns WHERE archived_at IS NULL AND started_at IS NOT NULL ORDER BY id DESC LIMIT 1"
+            old_id = conn.execute(active).fetchone()[0]
+            conn.execute("UPDATE campaigns SET archived_at = ? WHERE id = ?", (_now(), old_id))
+            conn.execute("UPDATE campaigns SET started_at = ? WHERE id = ?", (_now(), new_id))
+        return self.get(old_id), self.get(new_id)
+
+    def pending_snapshots(self) -> List[Dict[str, Any]]:
+        return self._rows("WHERE archived_at IS NOT NULL AND snapshot IS NULL")
+
+    def set_snapshot(self, campaign_id: int, path: str) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute("UPDATE campaigns SET snapshot = ?, snapshot_error = NULL WHERE id = ?", (path, campaign_id))
+
+    def set_snapshot_error(self, campaign_id: int, error: str) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute("UPDATE campaigns SET snapshot_error = ? WHERE id = ?", (error, campaign_id))
+
+    def snapshot(self, campaign: Dict[str, Any], ws, path: str) -> bool:
+        """Write the campaign's snapshot; a failure is logged and kept on the campaign row so it can be retried."""
+        try:
+            write_snapshot(ws, path, campaign["id"])
+        except Exception as e:
+            logger.exception("Snapshot of campaign %s failed", campaign["id"])
+            self.set_snapshot_error(campaign["id"], f"{type(e).__name__}: {e}")
+            return False
+        self.set_snapshot(campaign["id"], path)
+        return True
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def iter_sheet_rows(ws, chunk_rows: int = SNAPSHOT_CHUNK_ROWS) -> Iterator[List[str]]:
+    """Page through the data rows of a worksheet instead of loading it with get_all_values()."""
+    first = 2
+    while True:
+        rows = ws.get(f"A{first}:C{first + chunk_rows - 1}")
+        for row in rows:
+            yield (list(row) + [""] * len(HEADER))[: len(HEADER)]
+        if len(rows) < chunk_rows:
+            return
+        first += chunk_rows
+
+
+def _flatten(campaign_id: int, rows: List[List[str]]) -> Dict[str, list]:
+    columns: Dict[str, list] = {name: [] for name in SNAPSHOT_COLUMNS}
+
+    def add(*values):
+        for name, value in zip(SNAPSHOT_COLUMNS, values):
+            columns[name].append(value)
+
+    for user_id, created_at, data in rows:
+        files = json.loads(data or "{}")
+        if not files:
+            add(campaign_id, str(user_id), created_at, None, None, None, None)
+        for filename, file_data in files.items():
+            updated_at = file_data.get("updated_at")
+            for question, answer in file_data.items():
+                if question != "updated_at":
+                    add(campaign_id, str(user_id), created_at, filename, updated_at, question, json.dumps(answer))
+    return columns
+
+
+def write_snapshot(ws, path: str, campaign_id: int, chunk_rows: int = SNAPSHOT_CHUNK_ROWS) -> int:
+    """Stream a partition into a zstd-compressed Parquet file, one row group per chunk of users; returns the rows written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([("campaign", pa.int32())] + [(name, pa.string()) for name in SNAPSHOT_COLUMNS[1:]])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    n_rows = 0
+    try:
+        with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+            chunk: List[List[str]] = []
+            for row in iter_sheet_rows(ws, chunk_rows):
+                chunk.append(row)
+                if len(chunk) == chunk_rows:
+                    table = pa.table(_flatten(campaign_id, chunk), schema=schema)
+                    writer.write_table(table)
+                    n_rows += table.num_rows
+                    chunk = []
+            if chunk:
+                table = pa.table(_flatten(campaign_id, chunk), schema=schema)
+                writer.write_table(table)
+                n_rows += table.num_rows
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return n_rows
+
+
+def read_snapshot_records(path: str) -> List[Dict[str, Any]]:
+    """Rebuild sheet-style records (user_id, created_at, data) from a snapshot, for the export and agreement tools."""
+    import pyarrow.parquet as pq
+
+    users: Dict[str, Dict[str, Any]] = {}
+    for batch in pq.ParquetFile(path).iter_batches(columns=SNAPSHOT_COLUMNS[1:]):
+        for user_id, created_at, filename, updated_at, question, answer in zip(*(col.to_pylist() for col in batch.columns)):
+            user = users.setdefault(user_id, {"user_id": user_id, "created_at": created_at, "data": {}})
+            if filename is not None:
+                file_data = user["data"].setdefault(filename, {})
+                file_data.pop("updated_at", None)
+                file_data[question] = json.loads(answer)
+                file_data["updated_at"] = updated_at
+    return [{**user, "data": json.dumps(user["data"])} for user in users.values()]
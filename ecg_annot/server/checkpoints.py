@@ -0,0 +1,29 @@
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+from ecg_annot.server.sqlite_sheet import connect
+
+
+class CheckpointStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with connect(db_path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS checkpoints (user_id TEXT PRIMARY KEY, updated_at TEXT, data TEXT)")
+
+    def save(self, user_id: str, data: Dict[str, Any]) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO checkpoints (user_id, updated_at, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data",
+                (user_id, datetime.utcnow().isoformat(timespec="seconds"), json.dumps(data)),
+            )
+
+    def load(self, user_id: str) -> Dict[str, Any] | None:
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT data FROM checkpoints WHERE user_id = ?", (user_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def clear(self, user_id: str) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM checkpoints WHERE user_id = ?", (user_id,))
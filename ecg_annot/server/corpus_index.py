@@ -0,0 +1,114 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+from ecg_annot.server.sqlite_sheet import connect
+
+SORT_COLUMNS = ("filename", "annotators", "last_updated", "agreement")
+AGREEMENT_STATUSES = ("pending", "single", "agree", "disagree")
+
+# Agreement compares whole answer sets: one distinct hash across annotators means they agree.
+AGREEMENT_SQL = "CASE WHEN COUNT(*) = 1 THEN 'single' WHEN COUNT(DISTINCT answers_hash) = 1 THEN 'agree' ELSE 'disagree' END"
+
+
+def answers_hash(file_data: Dict[str, Any]) -> str:
+    answers = {k: v for k, v in file_data.items() if k != "updated_at"}
+    return hashlib.sha256(json.dumps(answers, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CorpusIndex:
+    """Per-file annotation coverage, updated on each submission instead of rescanning every user's JSON blob."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_annotations ("
+                "filename TEXT NOT NULL, user_id TEXT NOT NULL, updated_at TEXT, answers_hash TEXT, PRIMARY KEY (filename, user_id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS corpus_files ("
+                "filename TEXT PRIMARY KEY, annotators INTEGER NOT NULL DEFAULT 0, last_updated TEXT, agreement TEXT NOT NULL DEFAULT 'pending')"
+            )
+            for column in ("annotators", "last_updated", "agreement"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS corpus_files_{column} ON corpus_files ({column}, filename)")
+
+    def record_submission(self, user_id: str, filename: str, file_data: Dict[str, Any]) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO file_annotations (filename, user_id, updated_at, answers_hash) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(filename, user_id) DO UPDATE SET updated_at = excluded.updated_at, answers_hash = excluded.answers_hash",
+                (filename, user_id, file_data.get("updated_at"), answers_hash(file_data)),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO corpus_files (filename, annotators, last_updated, agreement) "
+                f"SELECT filename, COUNT(*), MAX(updated_at), {AGREEMENT_SQL} FROM file_annotations WHERE filename = ? GROUP BY filename",
+                (filename,),
+            )
+
+    def add_files(self, filenames: Iterable[str]) -> None:
+        with connect(self.db_path) as conn:
+            conn.executemany("INSERT OR IGNORE INTO corpus_files (filename) VALUES (?)", ((f,) for f in filenames))
+
+    def rebuild(self, records: Iterable[Dict[str, Any]], filenames: Iterable[str] = ()) -> None:
+        """Backfill from sheet records (user_id, data) and the files known to the corpus."""
+
+        def annotations():
+            for record in records:
+                for filename, file_data in json.loads(record.get("data") or "{}").items():
+                    yield filename, str(record["user_id"]), file_data.get("updated_at"), answers_hash(file_data)
+
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM file_annotations")
+            conn.execute("DELETE FROM corpus_files")
+            conn.executemany(
+                "INSERT OR REPLACE INTO file_annotations (filename, user_id, updated_at, answers_hash) VALUES (?, ?, ?, ?)",
+                annotations(),
+            )
+            conn.execute(
+                "INSERT INTO corpus_files (filename, annotators, last_updated, agreement) "
+                f"SELECT filename, COUNT(*), MAX(updated_at), {AGREEMENT_SQL} FROM file_annotations GROUP BY filename"
+            )
+        self.add_files(filenames)
+
+    def is_empty(self) -> bool:
+        with connect(self.db_path) as conn:
+            return conn.execute("SELECT 1 FROM corpus_files LIMIT 1").fetchone() is None
+
+    def status_counts(self) -> Dict[str, int]:
+        with connect(self.db_path) as conn:
+            rows = conn.execute("SELECT agreement, COUNT(*) FROM corpus_files GROUP BY agreement").fetchall()
+        counts = dict.fromkeys(AGREEMENT_STATUSES, 0)
+        counts.update(dict(rows))
+        return counts
+
+    def query(
+        self,
+        search: str = "",
+        statuses: Iterable[str] = (),
+        min_annotators: int = 0,
+        sort: str = "last_updated",
+        descending: bool = True,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort column: {sort}")
+        clauses, params = ["annotators >= ?"], [min_annotators]
+        if search:
+            clauses.append("filename LIKE ? ESCAPE '\\'")
+            params.append("%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        statuses = list(statuses)
+        if statuses:
+            clauses.append(f"agreement IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        where = " AND ".join(clauses)
+        order = "DESC" if descending else "ASC"
+        with connect(self.db_path) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM corpus_files WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT filename, annotators, last_updated, agreement FROM corpus_files WHERE {where} "
+                f"ORDER BY {sort} {order}, filename {order} LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [dict(zip(SORT_COLUMNS, row)) for row in rows], total
@@ -0,0 +1,100 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from ecg_annot.configs.annotation import ALL_QUESTIONS_GRAPH
+from ecg_annot.configs.server import STATE_DB
+from ecg_annot.server.sqlite_sheet import connect
+
+EVENTS = ("answer", "back")
+
+
+def client_events(events: Any) -> List[Tuple[str, str, float | None]]:
+    """(question, event, dwell_ms) for each well-formed event posted by the browser; malformed entries are dropped."""
+    parsed = []
+    for event in events if isinstance(events, list) else []:
+        if not isinstance(event, dict) or not isinstance(event.get("key"), str) or event["key"] not in ALL_QUESTIONS_GRAPH:
+            continue
+        if event.get("event") not in EVENTS:
+            continue
+        dwell_ms = event.get("dwell_ms")
+        if isinstance(dwell_ms, bool) or not isinstance(dwell_ms, (int, float)) or not 0 <= dwell_ms < float("inf"):
+            dwell_ms = None
+        parsed.append((event["key"], event["event"], dwell_ms))
+    return parsed
+
+
+class EventLog:
+    def __init__(self, db_path: str, batch_size: int = 200, flush_interval: float = 10.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        with connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS question_events ("
+                "ts TEXT NOT NULL, user_id TEXT, filename TEXT, question TEXT NOT NULL, event TEXT NOT NULL, dwell_ms INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS question_events_question ON question_events (question, event)")
+
+    def record(self, user_id: str, filename: str | None, question: str, event: str, dwell_ms: float | None) -> None:
+        row = (datetime.utcnow().isoformat(timespec="milliseconds"), user_id, filename, question, event, None if dwell_ms is None else int(dwell_ms))
+        with self._lock:
+            self._buffer.append(row)
+            due = len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not rows:
+            return
+        with connect(self.db_path) as conn:
+            conn.executemany("INSERT INTO question_events (ts, user_id, filename, question, event, dwell_ms) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def aggregates(self, limit: int = 100_000) -> List[Dict[str, Any]]:
+        import numpy as np
+
+        self.flush()
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT question, event, dwell_ms FROM (SELECT * FROM question_events ORDER BY rowid DESC LIMIT ?)", (limit,)
+            ).fetchall()
+        by_question: Dict[str, Dict[str, list]] = {}
+        for question, event, dwell_ms in rows:
+            entry = by_question.setdefault(question, {"answer": [], "back": []})
+            entry.setdefault(event, []).append(dwell_ms)
+        result = []
+        for question, entry in by_question.items():
+            dwell = np.asarray([d for d in entry["answer"] if d is not None], dtype=float)
+            result.append({
+                "question": question,
+                "answers": len(entry["answer"]),
+                "backs": len(entry["back"]),
+                "back_rate": len(entry["back"]) / max(len(entry["answer"]), 1),
+                "median_dwell_s": float(np.median(dwell)) / 1000 if dwell.size else None,
+                "p90_dwell_s": float(np.percentile(dwell, 90)) / 1000 if dwell.size else None,
+                "total_dwell_min": float(dwell.sum()) / 60000,
+            })
+        return sorted(result, key=lambda r: r["total_dwell_min"], reverse=True)
+
+
+_shared_log = None
+_shared_log_lock = threading.Lock()
+
+
+def shared_event_log() -> EventLog:
+    global _shared_log
+    with _shared_log_lock:
+        if _shared_log is None:
+            os.makedirs(os.path.dirname(STATE_DB) or ".", exist_ok=True)
+            _shared_log = EventLog(STATE_DB)
+            atexit.register(_shared_log.flush)
+        return _shared_log
@@ -0,0 +1,156 @@
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterator, List
+
+BUCKETS_S = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class SpanStats:
+    def __init__(self, window: int):
+        self.recent: deque = deque(maxlen=window)
+        self.buckets = [0] * (len(BUCKETS_S) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.recent.append(seconds)
+        self.buckets[bisect_left(BUCKETS_S, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+
+class Registry:
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.spans: Dict[str, SpanStats] = {}
+        self.counters: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats(self.window)
+            stats.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def summary(self) -> List[Dict[str, float]]:
+        import numpy as np
+
+        with self._lock:
+            snapshot = {name: (list(s.recent), s.count, s.total) for name, s in self.spans.items()}
+        rows = []
+        for name, (recent, count, total) in sorted(snapshot.items()):
+            ms = np.asarray(recent) * 1000
+            rows.append({
+                "span": name,
+                "count": count,
+                "mean_ms": total / count * 1000,
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+            })
+        return rows
+
+    def recent(self, name: str) -> List[float]:
+        with self._lock:
+            return list(self.spans[name].recent) if name in self.spans else []
+
+    def render_openmetrics(self) -> str:
+        lines = [
+            "# TYPE ecg_annot_span_seconds histogram",
+            "# HELP ecg_annot_span_seconds Duration of instrumented hot paths.",
+        ]
+        with self._lock:
+            for name, stats in sorted(self.spans.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS_S + ["+Inf"], stats.buckets):
+                    cumulative += n
+                    lines.append(f'ecg_annot_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'ecg_annot_span_seconds_count{{span="{name}"}} {stats.count}')
+                lines.append(f'ecg_annot_span_seconds_sum{{span="{name}"}} {stats.total}')
+            lines.append("# TYPE ecg_annot_events counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'ecg_annot_events_total{{name="{name}"}} {value}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.render_openmetrics())
+        os.replace(tmp_path, path)
+
+
+METRICS = Registry()
+
+
+def span(name: str):
+    return METRICS.span(name)
+
+
+def inc(name: str, amount: float = 1) -> None:
+    METRICS.inc(name, amount)
+
+
+def timed(name: str):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with METRICS.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class InstrumentedWorksheet:
+    def __init__(self, ws, prefix: str = "backend"):
+        self._ws = ws
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._ws, name)
+        if not callable(attr):
+            return attr
+        return timed(f"{self._prefix}.{name}")(attr)
+
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+def start_file_exporter(path: str, interval: float = 15.0) -> None:
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+    path = path.format(pid=os.getpid())
+
+    def run():
+        while True:
+            time.sleep(interval)
+            METRICS.dump(path)
+
+    threading.Thread(target=run, name="metrics-exporter", daemon=True).start()
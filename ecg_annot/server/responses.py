@@ -0,0 +1,26 @@
+import json
+from datetime import datetime
+
+from ecg_annot.configs.annotation import ALL_QUESTIONS_GRAPH
+from ecg_annot.flow import clean_duration_answers
+
+
+def build_file_data(answers: dict) -> dict:
+    clean_answers = clean_duration_answers(answers)
+    file_data = {ALL_QUESTIONS_GRAPH[key]["question"]: answer for key, answer in clean_answers.items()}
+    file_data["updated_at"] = datetime.utcnow().isoformat(timespec="seconds")
+    return file_data
+
+
+def save_responses(ws, user_id: str, filename: str | None, answers: dict) -> dict:
+    all_data = ws.get_all_records()
+    existing_row = next((i + 2 for i, row in enumerate(all_data) if row.get("user_id") == user_id), None)
+    current_data = json.loads(all_data[existing_row - 2].get("data", "{}")) if existing_row else {}
+    file_data = build_file_data(answers)
+    current_data[filename] = file_data
+    data_str = json.dumps(current_data)
+    if existing_row:
+        ws.update_cell(existing_row, 3, data_str)
+    else:
+        ws.append_row([user_id, datetime.utcnow().isoformat(timespec="seconds"), data_str])
+    return file_data
@@ -0,0 +1,174 @@
+import csv
+import json
+import math
+from collections import Counter
+from datetime import datetime
+from typing import Any, Container, Dict, Iterable, List, Sequence
+
+from ecg_annot.configs.annotation import ALL_QUESTIONS_GRAPH
+from ecg_annot.server.sqlite_sheet import connect
+
+
+def normalized_entropy(counts: Iterable[float], n_classes: int) -> float:
+    counts = [c for c in counts if c > 0]
+    total = sum(counts)
+    if total <= 0 or n_classes < 2:
+        return 0.0
+    entropy = -sum(c / total * math.log(c / total) for c in counts)
+    return entropy / math.log(n_classes)
+
+
+class DisagreementScorer:
+    """Entropy of the annotators' answers to each question, averaged over the questions."""
+
+    name = "disagreement"
+
+    def __init__(self, question_keys: Sequence[str] = ("Duration", "T"), weight: float = 1.0):
+        self.questions = [(ALL_QUESTIONS_GRAPH[key]["question"], len(ALL_QUESTIONS_GRAPH[key]["choices"])) for key in question_keys]
+        self.weight = weight
+
+    def score(self, filename: str, annotations: List[Dict[str, Any]]) -> float:
+        if len(annotations) < 2:
+            return 0.0
+        entropies = []
+        for text, n_choices in self.questions:
+            answers = Counter(json.dumps(a[text], sort_keys=True) for a in annotations if text in a)
+            entropies.append(normalized_entropy(answers.values(), n_choices))
+        return self.weight * sum(entropies) / len(entropies)
+
+
+class RareClassScorer:
+    """Boost files where any annotator reported a rare finding, so they get a second opinion."""
+
+    name = "rare_class"
+
+    def __init__(self, rare_answers: Dict[str, str] | None = None, weight: float = 1.0):
+        rare_answers = rare_answers or {"Preexcitation": "Yes"}
+        self.rare = [(ALL_QUESTIONS_GRAPH[key]["question"], answer) for key, answer in rare_answers.items()]
+        self.weight = weight
+
+    def score(self, filename: str, annotations: List[Dict[str, Any]]) -> float:
+        hits = sum(any(a.get(text) == answer for text, answer in self.rare) for a in annotations)
+        return self.weight if hits else 0.0
+
+
+class CoverageScorer:
+    """Share of the target annotator count still missing, so pending files outrank ones annotators already agree on."""
+
+    name = "coverage"
+
+    def __init__(self, target: int = 2, weight: float = 1.0):
+        self.target = max(int(target), 1)
+        self.weight = weight
+
+    def score(self, filename: str, annotations: List[Dict[str, Any]]) -> float:
+        return self.weight * max(self.target - len(annotations), 0) / self.target
+
+
+class ModelProbabilityScorer:
+    """Uncertainty of a model's predictions read from a CSV with a filename column and one column per class."""
+
+    name = "model"
+
+    def __init__(self, path: str, weight: float = 1.0):
+        self.weight = weight
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            classes = [c for c in reader.fieldnames or [] if c != "filename"]
+            self.entropy = {row["filename"]: normalized_entropy([float(row[c] or 0) for c in classes], len(classes)) for row in reader}
+
+    def score(self, filename: str, annotations: List[Dict[str, Any]]) -> float:
+        return self.weight * self.entropy.get(filename, 0.0)
+
+
+def default_scorers(model_scores: str | None = None, target_annotators: int = 2) -> list:
+    scorers = [DisagreementScorer(), RareClassScorer(), CoverageScorer(target_annotators)]
+    if model_scores:
+        scorers.append(ModelProbabilityScorer(model_scores))
+    return scorers
+
+
+class Scheduler:
+    """Worklist of corpus files ranked by the sum of the scorer outputs, rescored per file on each submission."""
+
+    def __init__(self, db_path: str, scorers: Sequence[Any]):
+        self.db_path = db_path
+        self.scorers = list(scorers)
+        with connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scheduler_answers ("
+                "filename TEXT NOT NULL, user_id TEXT NOT NULL, data TEXT, PRIMARY KEY (filename, user_id))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS worklist (filename TEXT PRIMARY KEY, score REAL NOT NULL, reasons TEXT, scored_at TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS worklist_score ON worklist (score DESC, filename)")
+
+    def _score(self, filename: str, annotations: List[Dict[str, Any]]):
+        reasons = {scorer.name: round(scorer.score(filename, annotations), 4) for scorer in self.scorers}
+        return filename, sum(reasons.values()), json.dumps(reasons), datetime.utcnow().isoformat(timespec="seconds")
+
+    def _upsert(self, conn, rows) -> None:
+        conn.executemany(
+            "INSERT INTO worklist (filename, score, reasons, scored_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(filename) DO UPDATE SET score = excluded.score, reasons = excluded.reasons, scored_at = excluded.scored_at",
+            rows,
+        )
+
+    def _annotations(self, conn, filename: str) -> List[Dict[str, Any]]:
+        rows = conn.execute("SELECT data FROM scheduler_answers WHERE filename = ?", (filename,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def add_files(self, filenames: Iterable[str]) -> None:
+        with connect(self.db_path) as conn:
+            known = {row[0] for row in conn.execute("SELECT filename FROM worklist")}
+            self._upsert(conn, (self._score(f, []) for f in filenames if f not in known))
+
+    def record_submission(self, user_id: str, filename: str, file_data: Dict[str, Any]) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO scheduler_answers (filename, user_id, data) VALUES (?, ?, ?) "
+                "ON CONFLICT(filename, user_id) DO UPDATE SET data = excluded.data",
+                (filename, user_id, json.dumps(file_data)),
+            )
+            self._upsert(conn, [self._score(filename, self._annotations(conn, filename))])
+
+    def rescore_all(self) -> None:
+        with connect(self.db_path) as conn:
+            filenames = [row[0] for row in conn.execute("SELECT filename FROM worklist")]
+            self._upsert(conn, [self._score(f, self._annotations(conn, f)) for f in filenames])
+
+    def backfill(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Load every stored answer from sheet records (user_id, data) and rescore the worklist."""
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM scheduler_answers")
+            conn.executemany(
+                "INSERT OR REPLACE INTO scheduler_answers (filename, user_id, data) VALUES (?, ?, ?)",
+                (
+                    (filename, str(record["user_id"]), json.dumps(file_data))
+                    for record in records
+                    for filename, file_data in json.loads(record.get("data") or "{}").items()
+                ),
+            )
+            conn.execute("INSERT OR IGNORE INTO worklist (filename, score) SELECT DISTINCT filename, 0 FROM scheduler_answers")
+        self.rescore_all()
+
+    def next_record(self, exclude: Iterable[str] = (), candidates: Container[str] | None = None, user_id: str | None = None) -> str | None:
+        """Top-scored worklist file in candidates, not in exclude and not already annotated by user_id.
+
+        Candidates only filter the worklist; new files join it through add_files.
+        """
+        exclude = set(exclude)
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT filename FROM worklist WHERE filename NOT IN (SELECT filename FROM scheduler_answers WHERE user_id = ?) "
+                "ORDER BY score DESC, filename",
+                (user_id,),
+            )
+            for (filename,) in rows:
+                if filename not in exclude and (candidates is None or filename in candidates):
+                    return filename
+        return None
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with connect(self.db_path) as conn:
+            rows = conn.execute("SELECT filename, score, reasons FROM worklist ORDER BY score DESC, filename LIMIT ?", (limit,)).fetchall()
+        return [{"filename": f, "score": round(score, 4), **json.loads(reasons)} for f, score, reasons in rows]
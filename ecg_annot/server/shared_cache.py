@@ -0,0 +1,134 @@
+import os
+import tempfile
+import threading
+from typing import Any, Callable, List, Tuple
+
+import numpy as np
+
+from ecg_annot.server.metrics import inc
+
+# Eviction trims the cache to this share of max_bytes so that it does not run on every write at the limit.
+LOW_WATER = 0.9
+
+
+class SharedCache:
+    """Content-keyed files shared by the workers on one host, evicted least recently used past max_bytes.
+
+    Arrays are read back memory-mapped so workers share them through the page cache. A hit refreshes the
+    file's mtime, which eviction orders by (atime is not updated on relatime/noatime mounts).
+    """
+
+    def __init__(self, directory: str, max_bytes: int | None = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{ext}")
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _touch(self, path: str) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _written(self, path: str, size: int) -> None:
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict(keep=path)
+
+    def _evict(self, keep: str) -> None:
+        # Rescan rather than trust the counter: other workers write to the same directory.
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes * LOW_WATER:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._bytes = total
+        if evicted:
+            inc("shared_cache.evict", evicted)
+
+    def _write(self, path: str, write: Callable[[Any], None]) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._written(path, size)
+
+    def get_array(self, key: str) -> np.ndarray | None:
+        path = self._path(key, ".npy")
+        try:
+            arr = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return arr
+
+    def put_array(self, key: str, arr: np.ndarray) -> None:
+        self._write(self._path(key, ".npy"), lambda f: np.save(f, arr))
+
+    def get_bytes(self, key: str) -> bytes | None:
+        path = self._path(key, ".bin")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return data
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        self._write(self._path(key, ".bin"), lambda f: f.write(data))
+
+    def array(self, key: str, loader: Callable[[], np.ndarray]) -> np.ndarray:
+        arr = self.get_array(key)
+        inc("shared_cache.miss" if arr is None else "shared_cache.hit")
+        if arr is None:
+            loaded = loader()
+            self.put_array(key, loaded)
+            arr = self.get_array(key)
+            if arr is None:
+                arr = loaded
+        return arr
+
+    def blob(self, key: str, loader: Callable[[], bytes]) -> bytes:
+        data = self.get_bytes(key)
+        inc("shared_cache.miss" if data is None else "shared_cache.hit")
+        if data is None:
+            data = loader()
+            self.put_bytes(key, data)
+        return data
@@ -0,0 +1,68 @@
+import re
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+HEADER = ["user_id", "created_at", "data"]
+
+
+@contextmanager
+def connect(db_path: str) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# Local stand-in for the gspread worksheet: the subset of its API that launch.py uses,
+# with rows numbered the same way (row 1 is the header).
+class SqliteWorksheet:
+    def __init__(self, db_path: str, table: str = "users"):
+        self.db_path = db_path
+        self.table = table
+        with connect(db_path) as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (user_id TEXT PRIMARY KEY, created_at TEXT, data TEXT)")
+
+    def get_all_values(self) -> List[List[str]]:
+        with connect(self.db_path) as conn:
+            rows = conn.execute(f"SELECT {', '.join(HEADER)} FROM {self.table} ORDER BY rowid").fetchall()
+        return [HEADER[:]] + [["" if v is None else v for v in row] for row in rows]
+
+    def get(self, range_name: str) -> List[List[str]]:
+        """Rows of an A1 range such as "A2:C501"; only whole-row ranges over the three columns are supported."""
+        match = re.fullmatch(r"A(\d+):C(\d+)", range_name)
+        if match is None:
+            raise ValueError(f"Unsupported range: {range_name}")
+        first, last = int(match.group(1)), int(match.group(2))
+        header = [HEADER[:]] if first == 1 else []
+        first = max(first, 2)
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(HEADER)} FROM {self.table} ORDER BY rowid LIMIT ? OFFSET ?",
+                (max(last - first + 1, 0), first - 2),
+            ).fetchall()
+        return header + [["" if v is None else v for v in row] for row in rows]
+
+    def get_all_records(self) -> List[Dict[str, Any]]:
+        return [dict(zip(HEADER, row)) for row in self.get_all_values()[1:]]
+
+    def append_row(self, values: List[Any]) -> None:
+        if list(values) == HEADER:
+            return
+        with connect(self.db_path) as conn:
+            conn.execute(f"INSERT INTO {self.table} ({', '.join(HEADER)}) VALUES (?, ?, ?)", tuple(values))
+
+    def update_cell(self, row: int, col: int, value: Any) -> None:
+        column = HEADER[col - 1]
+        with connect(self.db_path) as conn:
+            conn.execute(
+                f"UPDATE {self.table} SET {column} = ? WHERE rowid = (SELECT rowid FROM {self.table} ORDER BY rowid LIMIT 1 OFFSET ?)",
+                (value, row - 2),
+            )
+
+    def clear(self) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute(f"DELETE FROM {self.table}")
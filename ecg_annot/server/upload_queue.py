@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List
+
+from ecg_annot.server.array_store import ArrayStore, content_key
+
+# decode(key, filename, file_bytes) -> record
+Decoder = Callable[[str, str, bytes], Any]
+
+
+def spool_upload(directory: str, file_bytes: bytes, ttl: float) -> str:
+    """Write an upload to the spool directory, removing spooled files older than ttl left by abandoned sessions.
+
+    Files of queued jobs are kept fresh with keep_spooled, so only files no live queue has touched within ttl go.
+    """
+    os.makedirs(directory, exist_ok=True)
+    cutoff = time.time() - ttl
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    with os.fdopen(fd, "wb") as f:
+        f.write(file_bytes)
+    return path
+
+
+def read_spooled(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _decode_into_store(store: ArrayStore, key: str, filename: str, path: str, decode: Decoder) -> None:
+    if key not in store:
+        store.put(key, decode(key, filename, read_spooled(path)))
+
+
+def submit_upload(pool: Executor, store: ArrayStore, directory: str, filename: str, file_bytes: bytes, decode: Decoder, ttl: float) -> Dict[str, Any]:
+    """Spool an upload and decode it on the pool into the store, where it is evicted like any unheld record.
+
+    The job only keeps the spool path, so a record evicted before its turn is decoded again from disk.
+    """
+    key = content_key(file_bytes)
+    path = spool_upload(directory, file_bytes, ttl)
+    future = pool.submit(_decode_into_store, store, key, filename, path, decode)
+    return {"filename": filename, "key": key, "path": path, "future": future}
+
+
+def keep_spooled(jobs: List[Dict[str, Any]]) -> None:
+    """Refresh the spool files of jobs still waiting so that other sessions' sweeps leave them alone."""
+    for job in jobs:
+        try:
+            os.utime(job["path"])
+        except FileNotFoundError:
+            pass
+
+
+def discard_upload(job: Dict[str, Any]) -> None:
+    job["future"].cancel()
+    try:
+        os.unlink(job["path"])
+    except FileNotFoundError:
+        pass
+
+
+def pop_ready(
+    queue: List[Dict[str, Any]], errors: List[str], hold: Callable[[str, Callable[[], Any]], Any], decode: Decoder
+) -> Dict[str, Any] | None:
+    """Hold the next upload in the queue, waiting for its decode; uploads that fail are reported in errors and skipped."""
+    while queue:
+        job = queue.pop(0)
+        try:
+            job["future"].result()
+            hold(job["key"], lambda: decode(job["key"], job["filename"], read_spooled(job["path"])))
+        except Exception as e:
+            errors.append(f"{job['filename']}: {e}")
+            continue
+        finally:
+            discard_upload(job)
+        keep_spooled(queue)
+        return job
+    return None
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import List
+
+from ecg_annot.server.sqlite_sheet import connect
+
+
+class UserStateStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completed_files ("
+                "user_id TEXT NOT NULL, filename TEXT NOT NULL, completed_at TEXT, PRIMARY KEY (user_id, filename))"
+            )
+
+    def completed_files(self, user_id: str) -> List[str]:
+        with connect(self.db_path) as conn:
+            rows = conn.execute("SELECT filename FROM completed_files WHERE user_id = ? ORDER BY completed_at, rowid", (user_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def add_completed_file(self, user_id: str, filename: str) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO completed_files (user_id, filename, completed_at) VALUES (?, ?, ?)",
+                (user_id, filename, datetime.utcnow().isoformat(timespec="seconds")),
+            )
+
+    def clear_completed_files(self, user_id: str) -> None:
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM completed_files WHERE user_id = ?", (user_id,))
+
+    def clear_all_completed_files(self) -> None:
+        """Forget every user's completed files, e.g. when a new campaign starts."""
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM completed_files")
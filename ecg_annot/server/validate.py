@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+from typing import Any, Dict, Iterable, List
+
+from ecg_annot.configs.annotation import ALL_QUESTIONS_GRAPH, NOISE_TO_LEAD_QUESTION, QRS_QUESTION_ORDER
+from ecg_annot.configs.server import STATE_DB
+from ecg_annot.flow import DURATION_FOLLOWUPS
+
+ISSUE_COLUMNS = ["user_id", "filename", "issue", "question", "detail"]
+ISSUES = ("unknown_question", "invalid_choice", "unexpected_answer", "missing_answer")
+
+# Stored answers are keyed by question text; checks run on the question keys.
+QUESTION_KEYS = {data["question"]: key for key, data in ALL_QUESTIONS_GRAPH.items()}
+MULTILABEL = {key for key, data in ALL_QUESTIONS_GRAPH.items() if data.get("multilabel")}
+
+
+def flatten_answers(records: Iterable[Dict[str, Any]]):
+    """Flatten sheet records (user_id, data) into one row per annotated file and one row per stored answer.
+
+    Answers reference their file by its integer row number, so the checks pivot on an int index.
+    """
+    import pandas as pd
+
+    files: Dict[str, list] = {"user_id": [], "filename": []}
+    answers: Dict[str, list] = {"record": [], "question": [], "key": [], "answer": []}
+    for record in records:
+        user_id = str(record["user_id"])
+        for filename, file_data in json.loads(record.get("data") or "{}").items():
+            row = len(files["filename"])
+            files["user_id"].append(user_id)
+            files["filename"].append(filename)
+            for question, answer in file_data.items():
+                if question != "updated_at":
+                    answers["record"].append(row)
+                    answers["question"].append(question)
+                    answers["key"].append(QUESTION_KEYS.get(question))
+                    answers["answer"].append(answer)
+    answers = pd.DataFrame(answers, dtype=object)
+    return pd.DataFrame(files), answers.astype({"record": "int64"})
+
+
+def _issues(frame, issue: str):
+    return frame.assign(issue=issue)[["record", "issue", "question", "detail"]]
+
+
+def _cell_issues(mask, issue: str, detail):
+    """One issue row per True cell of a (record × question key) mask; detail is a constant or a matrix of the same shape."""
+    import numpy as np
+    import pandas as pd
+
+    rows, cols = np.nonzero(mask.to_numpy())
+    detail = detail.to_numpy()[rows, cols] if isinstance(detail, pd.DataFrame) else detail
+    return pd.DataFrame({"record": mask.index[rows], "issue": issue, "question": mask.columns[cols], "detail": detail})
+
+
+def _choice_issues(answers):
+    """Answers of the wrong shape or outside the question's choices; also returns one row per selected choice."""
+    import pandas as pd
+
+    known = answers[answers["key"].notna()]
+    is_list = known["answer"].map(lambda answer: isinstance(answer, list))
+    multilabel = known["key"].isin(MULTILABEL)
+    shape = pd.concat([
+        known[multilabel & ~is_list].assign(detail="expects a list of choices"),
+        known[~multilabel & is_list].assign(detail="expects a single choice"),
+    ])
+
+    choices = pd.concat([known[~multilabel & ~is_list], known[multilabel & is_list].explode("answer").dropna(subset=["answer"])])
+    choices = choices.assign(answer=choices["answer"].where(choices["answer"].map(type).eq(str)))
+    valid = pd.DataFrame([(key, choice) for key, data in ALL_QUESTIONS_GRAPH.items() for choice in data["choices"]], columns=["key", "answer"])
+    merged = choices.merge(valid.assign(valid=True), on=["key", "answer"], how="left")
+    invalid = merged[merged["valid"].isna()]
+    invalid = invalid.assign(detail="not one of the choices: " + invalid["answer"].astype(str))
+    duplicated = merged[merged.duplicated(["record", "key", "answer"])]
+    duplicated = duplicated.assign(detail="duplicate choice: " + duplicated["answer"].astype(str))
+
+    noise = merged[merged["key"].eq("Noise artifacts")]
+    noise = noise.assign(none=noise["answer"].eq("None")).groupby("record").agg(none=("none", "any"), n=("none", "size"))
+    conflicting = noise[noise["none"] & noise["n"].gt(1)].reset_index()
+    conflicting = conflicting.assign(key="Noise artifacts", detail='"None" selected together with other artifacts')
+
+    frames = [shape, invalid, duplicated, conflicting]
+    return pd.concat([frame.drop(columns="question", errors="ignore").rename(columns={"key": "question"}) for frame in frames]), choices
+
+
+def _reasons(answers, choices, n_records: int):
+    """Why each question should not have been asked for each record (NaN where the flow asks it), mirroring get_next_question_key."""
+    import pandas as pd
+
+    keys = list(ALL_QUESTIONS_GRAPH)
+    records = pd.RangeIndex(n_records)
+    known = answers[answers["key"].notna()].drop_duplicates(["record", "key"])
+    single = known[~known["key"].isin(MULTILABEL)]
+    wide = single.pivot(index="record", columns="key", values="answer").reindex(index=records, columns=keys)
+    answered = known.assign(answered=True).pivot(index="record", columns="key", values="answered").reindex(index=records, columns=keys).notna()
+    noise = choices[choices["key"].eq("Noise artifacts") & choices["answer"].notna()].drop_duplicates(["record", "answer"])
+    selected = noise.assign(selected=True).pivot(index="record", columns="answer", values="selected")
+    selected = selected.reindex(index=records, columns=ALL_QUESTIONS_GRAPH["Noise artifacts"]["choices"]).notna()
+    only_none = selected["None"] & ~selected.drop(columns="None").any(axis=1)
+
+    asystole = wide["QRS"].eq("No (Asystole)")
+    preexcitation = wide["Preexcitation"]
+    qrs_followups = [key for key in QRS_QUESTION_ORDER if key != "QRS"] + DURATION_FOLLOWUPS
+    rules = [
+        (list(NOISE_TO_LEAD_QUESTION.values()), only_none, 'Noise artifacts is "None"'),
+        *(([lead_key], ~selected[noise_type], f"{noise_type} not selected") for noise_type, lead_key in NOISE_TO_LEAD_QUESTION.items()),
+        (qrs_followups, asystole, "QRS is No (Asystole)"),
+        (["AP"], preexcitation.eq("No"), "Preexcitation is No"),
+        (["Duration"] + DURATION_FOLLOWUPS, preexcitation.eq("Yes") & answered["AP"], "Preexcitation is Yes and AP is answered"),
+        *(([followup], wide["Duration"].ne(followup), f"Duration is not {followup}") for followup in DURATION_FOLLOWUPS),
+    ]
+    reasons = pd.DataFrame(index=records, columns=keys, dtype=object)
+    for rule_keys, mask, reason in rules:
+        for key in rule_keys:
+            reasons[key] = reasons[key].where(reasons[key].notna() | ~mask, reason)
+    return reasons, answered
+
+
+def validate_records(records: Iterable[Dict[str, Any]]):
+    """Flag inconsistent or incomplete annotations across sheet records (user_id, data).
+
+    Returns one row per issue with ISSUE_COLUMNS; an empty frame means every stored answer
+    set is one the question flow could have produced.
+    """
+    import pandas as pd
+
+    files, answers = flatten_answers(records)
+    unknown = answers[answers["key"].isna()].assign(detail="not in ALL_QUESTIONS_GRAPH")
+    choice_issues, choices = _choice_issues(answers)
+    reasons, answered = _reasons(answers, choices, len(files))
+    frames = [
+        _issues(unknown, "unknown_question"),
+        _issues(choice_issues, "invalid_choice"),
+        _cell_issues(answered & reasons.notna(), "unexpected_answer", reasons),
+        _cell_issues(~answered & reasons.isna(), "missing_answer", "not answered"),
+    ]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    issues = pd.concat(frames).sort_values("record", kind="stable").reset_index(drop=True)
+    return files.loc[issues["record"]].reset_index(drop=True).join(issues)[ISSUE_COLUMNS]
+
+
+def summarize(issues) -> Dict[str, int]:
+    counts = dict.fromkeys(ISSUES, 0)
+    counts.update(issues["issue"].value_counts().to_dict())
+    return counts
+
+
+def load_records(campaign_id: int | None = None) -> List[Dict[str, Any]]:
+    from ecg_annot.server.api import open_worksheet
+    from ecg_annot.server.campaigns import CampaignStore, read_snapshot_records
+
+    store = CampaignStore(STATE_DB)
+    campaign = store.active() if campaign_id is None else store.get(campaign_id)
+    if campaign["snapshot"] and os.path.exists(campaign["snapshot"]):
+        return read_snapshot_records(campaign["snapshot"])
+    return open_worksheet(campaign["partition"]).get_all_records()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check stored annotations for answers the question flow could not have produced.")
+    parser.add_argument("--campaign", type=int, default=None, help="campaign id (default: the active campaign)")
+    parser.add_argument("--output", default=None, help="write the issues to this CSV file")
+    args = parser.parse_args()
+    issues = validate_records(load_records(args.campaign))
+    for issue, count in summarize(issues).items():
+        print(f"{issue:>18}: {count:,}")
+    flagged = len(issues.drop_duplicates(["user_id", "filename"]))
+    print(f"{flagged:,} annotations with issues")
+    if args.output:
+        issues.to_csv(args.output, index=False)
+    raise SystemExit(1 if len(issues) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,8 +24,10 @@ INSTALL_REQUIRES = [
     "gradio==5.31.0",
     "termcolor==3.0.1",
     "pytest",
+    "pytest-benchmark",
     "streamlit==1.51.0",
     "plotly",
+    "pyarrow",
     "gspread",
     "google-auth",
     "streamlit-plotly-events",
@@ -44,4 +46,5 @@ setup(
     python_requires=">=3.10",
     install_requires=INSTALL_REQUIRES,
     include_package_data=True,
+    package_data={"ecg_annot": ["components/*/frontend/*"]},
 )
@@ -0,0 +1,63 @@
+import numpy as np
+
+from ecg_annot.server.array_store import ArrayStore, content_key
+
+
+def test_shared_entry_is_decoded_once_and_evicted_when_unheld():
+    store = ArrayStore(max_bytes=100, holder_ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return np.zeros(20, dtype=np.float32)
+
+    key = content_key(b"record")
+    a = store.acquire(key, "session-a", loader)
+    b = store.acquire(key, "session-b", loader)
+    assert a is b and len(calls) == 1 and store.refcount(key) == 2
+
+    store.acquire("other", "session-c", lambda: np.zeros(10, dtype=np.float32))
+    assert key in store
+
+    store.release(key, "session-a")
+    store.release(key, "session-b")
+    assert key not in store and "other" in store
+
+
+def test_put_entries_are_unheld_and_evicted_first():
+    store = ArrayStore(max_bytes=100, holder_ttl=60)
+    store.acquire("held", "session-a", lambda: np.zeros(15, dtype=np.float32))
+    store.put("queued", np.zeros(10, dtype=np.float32))
+    assert "queued" in store and store.refcount("queued") == 0
+    assert not store.get("queued", "session-b").flags.writeable
+    store.release("queued", "session-b")
+
+    store.put("next", np.zeros(10, dtype=np.float32))
+    assert "queued" not in store and "held" in store and "next" in store
+
+
+def test_stored_records_are_read_only_and_memmaps_have_their_own_budget(tmp_path):
+    from ecg_annot.data_utils.records import ArrayRecord, ECGRecord
+
+    store = ArrayStore(max_bytes=1000, holder_ttl=60, max_mapped_bytes=10_000)
+    record = store.acquire("xml", "session-a", lambda: ECGRecord(np.zeros((2, 10), dtype=np.int16), ["I", "II"], [1.0, 1.0]))
+    assert not record.samples.flags.writeable and store.nbytes == 40
+
+    for i in range(20):
+        np.save(tmp_path / f"{i}.npy", np.zeros((12, 100), dtype=np.float32))
+        mapped = ArrayRecord(np.load(tmp_path / f"{i}.npy", mmap_mode="r"))
+        assert (mapped.nbytes, mapped.mapped_nbytes) == (0, 4800)
+        store.put(f"npy-{i}", mapped)
+    assert store.nbytes == 40 and store.mapped_nbytes == 9600
+    assert "xml" in store and "npy-17" not in store and "npy-18" in store and "npy-19" in store
+
+
+def test_records_are_resized_as_their_leads_are_decoded():
+    from ecg_annot.data_utils.records import ECGRecord
+
+    store = ArrayStore(max_bytes=2**30, holder_ttl=60)
+    record = store.acquire("xml", "session-a", lambda: ECGRecord.from_xml_path("data/batch_9.xml"))
+    assert store.nbytes == record.nbytes and not record._decoded
+    record.window(["V1"], 0, 100)
+    store.get("xml", "session-a")
+    assert store.nbytes == record.nbytes and list(record._decoded) == ["V1"]
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from ecg_annot.server.checkpoints import CheckpointStore
+from ecg_annot.server.campaigns import CampaignStore, read_snapshot_records, write_snapshot
+from ecg_annot.server.sqlite_sheet import SqliteWorksheet
+
+
+def test_new_campaign_switches_partition_and_keeps_the_old_one(tmp_path):
+    store = CampaignStore(str(tmp_path / "state.db"))
+    assert store.active()["partition"] == "users"
+
+    def fail(partition):
+        raise RuntimeError(partition)
+
+    with pytest.raises(RuntimeError):
+        store.start_next(fail)
+    assert store.active()["id"] == 1 and len(store.campaigns()) == 1
+
+    created = []
+
+    def create(partition):
+        # The partition is created without holding state.db's write lock, and the new campaign is not active yet.
+        CheckpointStore(str(tmp_path / "state.db")).save("u1", {"answers": {}})
+        assert store.active()["id"] == 1 and len(store.campaigns()) == 1
+        created.append(partition)
+
+    old, new = store.start_next(create)
+    assert created == [new["partition"]] == [f"users_{new['id']}"] and store.active() == new
+    assert old["archived_at"] is not None and [c["id"] for c in store.campaigns()] == [new["id"], 1]
+
+
+def test_snapshot_round_trips_sheet_records_in_chunks(tmp_path):
+    ws = SqliteWorksheet(str(tmp_path / "responses.db"))
+    rows = [
+        ["u1", "t0", json.dumps({"a.xml": {"Q1": ["None"], "Q2": "Yes", "updated_at": "t1"}})],
+        ["u2", "t0", json.dumps({})],
+        ["u3", "t0", json.dumps({"a.xml": {"Q1": ["V1", "V2"], "updated_at": "t2"}, "b.xml": {"Q2": "No", "updated_at": "t3"}})],
+    ]
+    for row in rows:
+        ws.append_row(row)
+    path = str(tmp_path / "campaign_1.parquet")
+    assert write_snapshot(ws, path, 1, chunk_rows=2) == 5
+    assert read_snapshot_records(path) == [dict(zip(["user_id", "created_at", "data"], row)) for row in rows]
+
+
+def test_failed_snapshot_is_recorded_and_retried(tmp_path):
+    store = CampaignStore(str(tmp_path / "state.db"))
+    old, _ = store.start_next()
+    path = str(tmp_path / "campaign_1.parquet")
+
+    class Broken:
+        def get(self, range_name):
+            raise ConnectionError("quota exceeded")
+
+    assert not store.snapshot(old, Broken(), path)
+    assert [c["snapshot_error"] for c in store.pending_snapshots()] == ["ConnectionError: quota exceeded"]
+    assert list(tmp_path.glob("*.tmp")) == []
+
+    ws = SqliteWorksheet(str(tmp_path / "responses.db"))
+    ws.append_row(["u1", "t0", json.dumps({"a.xml": {"Q": "Yes", "updated_at": "t1"}})])
+    assert store.snapshot(old, ws, path)
+    assert store.pending_snapshots() == [] and store.get(old["id"])["snapshot_error"] is None
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+from ecg_annot.server.checkpoints import CheckpointStore
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+from streamlit.testing.v1 import AppTest
+from ecg_annot.data_utils.records import ECGRecord
+from ecg_annot.server.array_store import content_key, shared_array_store
+
+path = "data/batch_9.xml"
+key = content_key(open(path, "rb").read())
+at = AppTest.from_file("ecg_annot/launch.py", default_timeout=60)
+at.query_params["uid"] = "u1"
+at.run()
+at.button[0].click().run()
+shared_array_store().acquire(key, at.session_state["session_id"], lambda: ECGRecord.from_xml_path(path))
+for name, value in dict(record_key=key, file_type="signal", file_uploaded=True, current_filename="batch_9.xml").items():
+    at.session_state[name] = value
+at.run()
+at.multiselect[0].set_value(["None"]).run()
+[b for b in at.button if b.label == "Next"][0].click().run()
+at.toggle[0].set_value(True).run()
+assert not at.exception, at.exception
+
+reloaded = AppTest.from_file("ecg_annot/launch.py", default_timeout=60)
+reloaded.query_params["uid"] = "u1"
+reloaded.run()
+assert not reloaded.exception, reloaded.exception
+state = reloaded.session_state
+print(state["rapid_mode"], state["current_filename"], state["answers"] == at.session_state["answers"], state["navigation_history"])
+"""
+
+
+def test_checkpoints_are_saved_loaded_and_cleared_per_user(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = CheckpointStore(path)
+    assert store.load("u1") is None
+    store.save("u1", {"answers": {"Noise artifacts": ["None"]}, "rapid_mode": False})
+    store.save("u1", {"answers": {"Noise artifacts": ["None"], "QRS": "Yes"}, "rapid_mode": True})
+    store.save("u2", {"answers": {}})
+    assert CheckpointStore(path).load("u1") == {"answers": {"Noise artifacts": ["None"], "QRS": "Yes"}, "rapid_mode": True}
+
+    store.clear("u1")
+    assert store.load("u1") is None and store.load("u2") == {"answers": {}}
+
+
+def test_reload_restores_answers_and_rapid_mode(tmp_path):
+    env = dict(
+        os.environ,
+        PYTHONPATH=REPO_ROOT,
+        ECG_ANNOT_STATE_DIR=str(tmp_path),
+        ECG_ANNOT_RESPONSE_BACKEND="sqlite",
+        ECG_ANNOT_RESPONSES_DB=str(tmp_path / "responses.db"),
+    )
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split(" ", 3)[:3] == ["True", "batch_9.xml", "True"]
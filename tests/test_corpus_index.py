@@ -0,0 +1,32 @@
+import json
+
+from ecg_annot.server.corpus_index import CorpusIndex
+
+
+def test_index_tracks_coverage_and_agreement_incrementally(tmp_path):
+    index = CorpusIndex(str(tmp_path / "state.db"))
+    index.add_files(["a.xml", "b.xml", "c_1.xml"])
+    index.record_submission("u1", "a.xml", {"Q": "Yes", "updated_at": "2024-01-01T00:00:00"})
+    index.record_submission("u2", "a.xml", {"Q": "Yes", "updated_at": "2024-01-02T00:00:00"})
+    index.record_submission("u1", "b.xml", {"Q": "Yes", "updated_at": "2024-01-01T00:00:00"})
+    index.record_submission("u2", "b.xml", {"Q": "No", "updated_at": "2024-01-03T00:00:00"})
+    assert index.status_counts() == {"pending": 1, "single": 0, "agree": 1, "disagree": 1}
+
+    rows, total = index.query(sort="last_updated", descending=True)
+    assert total == 3 and [r["filename"] for r in rows] == ["b.xml", "a.xml", "c_1.xml"]
+    assert index.query(statuses=["disagree"])[0][0]["annotators"] == 2
+    assert index.query(search="_")[1] == 1
+    assert index.query(min_annotators=1, limit=1, offset=1, sort="filename", descending=False)[0][0]["filename"] == "b.xml"
+
+    index.record_submission("u2", "b.xml", {"Q": "Yes", "updated_at": "2024-01-04T00:00:00"})
+    assert index.status_counts()["agree"] == 2
+
+
+def test_rebuild_backfills_from_sheet_records(tmp_path):
+    index = CorpusIndex(str(tmp_path / "state.db"))
+    records = [
+        {"user_id": "u1", "data": json.dumps({"a.xml": {"Q": "Yes", "updated_at": "t1"}})},
+        {"user_id": 7, "data": json.dumps({"a.xml": {"Q": "No", "updated_at": "t2"}, "b.xml": {"Q": "No", "updated_at": "t3"}})},
+    ]
+    index.rebuild(records, ["a.xml", "b.xml", "c.xml"])
+    assert index.status_counts() == {"pending": 1, "single": 1, "agree": 0, "disagree": 1}
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+from ecg_annot.server import events
+from ecg_annot.server.events import EventLog, client_events
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stored(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT user_id, filename, question, event, dwell_ms FROM question_events ORDER BY rowid").fetchall()
+
+
+def test_events_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "state.db")
+    log = EventLog(path, batch_size=3, flush_interval=3600)
+    log.record("u1", "a.xml", "QRS", "answer", 1200.7)
+    log.record("u1", "a.xml", "Rhythm", "back", None)
+    assert stored(path) == []
+    log.record("u1", "a.xml", "QRS", "answer", 800)
+    assert stored(path) == [
+        ("u1", "a.xml", "QRS", "answer", 1200),
+        ("u1", "a.xml", "Rhythm", "back", None),
+        ("u1", "a.xml", "QRS", "answer", 800),
+    ]
+
+
+def test_events_are_flushed_once_the_interval_passes(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(events.time, "monotonic", lambda: now[0])
+    path = str(tmp_path / "state.db")
+    log = EventLog(path, batch_size=100, flush_interval=10)
+    log.record("u1", "a.xml", "QRS", "answer", 500)
+    assert stored(path) == []
+    now[0] += 10
+    log.record("u1", "a.xml", "QRS", "back", None)
+    assert len(stored(path)) == 2
+
+
+def test_buffered_events_are_flushed_at_exit(tmp_path):
+    probe = "from ecg_annot.server.events import shared_event_log; shared_event_log().record('u1', 'a.xml', 'QRS', 'answer', 500)"
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, ECG_ANNOT_STATE_DIR=str(tmp_path))
+    subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, env=env, check=True)
+    assert stored(str(tmp_path / "state.db")) == [("u1", "a.xml", "QRS", "answer", 500)]
+
+
+def test_malformed_client_events_are_dropped():
+    posted = [
+        {"key": "QRS", "event": "answer", "dwell_ms": 900},
+        {"key": "QRS", "event": "back", "dwell_ms": "slow"},
+        {"key": "QRS"},
+        {"event": "answer"},
+        {"key": "Not a question", "event": "answer"},
+        {"key": "QRS", "event": "shown"},
+        {"key": ["QRS"], "event": "answer"},
+        "QRS",
+    ]
+    assert client_events(posted) == [("QRS", "answer", 900), ("QRS", "back", None)]
+    assert client_events(None) == [] and client_events({"key": "QRS"}) == []
@@ -0,0 +1,215 @@
+import json
+
+import pytest
+
+from ecg_annot.flow import (
+    apply_back,
+    apply_next,
+    apply_review_back,
+    current_question_key,
+    new_flow_state,
+    replay_answers,
+    start_flow,
+    validate_answer,
+    validate_answers,
+)
+from ecg_annot.server import api
+from ecg_annot.server.api import AnnotationService
+from ecg_annot.server.array_store import ArrayStore
+from ecg_annot.server.scheduler import Scheduler, default_scorers
+from ecg_annot.server.sqlite_sheet import SqliteWorksheet
+from ecg_annot.server.user_state import UserStateStore
+
+
+def answer_all(state, answers):
+    for key, selected in answers:
+        assert current_question_key(state) == key
+        apply_next(state, key, selected)
+
+
+def test_duration_followup_and_back_navigation():
+    state = new_flow_state()
+    start_flow(state)
+    answer_all(
+        state,
+        [
+            ("Noise artifacts", ["Noise"]),
+            ("Noise leads", ["V1"]),
+            ("QRS", "Yes"),
+            ("Pacing", "No"),
+            ("Axis", "normal"),
+            ("Lead reversal", "No"),
+            ("Rate", "Normal"),
+            ("Amplitude", "Normal"),
+            ("Preexcitation", "No"),
+            ("Duration", ">120"),
+        ],
+    )
+    assert current_question_key(state) == ">120"
+    apply_back(state, ">120")
+    assert current_question_key(state) == "Duration"
+    answer_all(state, [("Duration", "<110"), ("<110", "Normal V1"), ("T", "Normal")])
+    assert state["show_review"] and current_question_key(state) is None
+    apply_review_back(state)
+    assert current_question_key(state) == "<110"
+
+
+def test_validate_answer_rejects_unknown_choices():
+    validate_answer("Noise leads", ["I", "V6"])
+    with pytest.raises(ValueError):
+        validate_answer("Noise leads", ["V7"])
+    with pytest.raises(ValueError):
+        validate_answer("QRS", "Maybe")
+    with pytest.raises(ValueError, match='"None" cannot be selected together'):
+        validate_answer("Noise artifacts", ["None", "Noise"])
+
+
+def test_replayed_rapid_progress_continues_step_by_step():
+    answers = {"Noise artifacts": ["Noise"], "Noise leads": ["V1"], "QRS": "Yes"}
+    state = replay_answers(answers, ["Noise artifacts", "Noise leads", "QRS"])
+    assert current_question_key(state) == "Pacing" and state["navigation_history"][-1] == "Pacing"
+    assert state["current_question_index"] > 0 and not state["show_review"]
+    apply_back(state, "Pacing")
+    assert current_question_key(state) == "QRS" and "QRS" not in state["answers"]
+
+    done = replay_answers({"Noise artifacts": ["None"], "QRS": "No (Asystole)", "T": "Normal"}, ["Noise artifacts", "QRS", "T"])
+    assert done["show_review"] and current_question_key(done) is None
+
+
+RAPID_SUBMISSION = {
+    "Noise artifacts": ["Noise", "Missing lead"],
+    "Missing lead leads": ["V6"],
+    "Noise leads": ["I", "aVR"],
+    "QRS": "Yes",
+    "Pacing": "No",
+    "Axis": "Left/LAFB",
+    "Lead reversal": "No",
+    "Rate": "Tachycardia",
+    "Amplitude": "Normal",
+    "Preexcitation": "No",
+    "Duration": "110-120",
+    "110-120": "incomplete RBBB",
+    "T": "Inverted",
+}
+
+
+def test_validate_answers_accepts_answer_sets_the_rapid_flow_submits():
+    validate_answers(RAPID_SUBMISSION)
+    validate_answers({"Noise artifacts": ["None"], "QRS": "No (Asystole)", "T": "Normal"})
+    preexcited = {key: RAPID_SUBMISSION[key] for key in ["Noise artifacts", "Missing lead leads", "Noise leads", "QRS", "Pacing", "Axis"]}
+    validate_answers({**preexcited, "Lead reversal": "No", "Rate": "Normal", "Amplitude": "Low", "Preexcitation": "Yes", "AP": "NW", "T": "Peaked"})
+
+
+@pytest.mark.parametrize(
+    "answers, message",
+    [
+        ({key: value for key, value in RAPID_SUBMISSION.items() if key != "Rate"}, "Missing answer for Rate"),
+        ({key: value for key, value in RAPID_SUBMISSION.items() if key != "Noise leads"}, "Missing answer for Noise leads"),
+        ({key: value for key, value in RAPID_SUBMISSION.items() if key != "110-120"}, "Missing answer for 110-120"),
+        ({**RAPID_SUBMISSION, "AP": "Normal"}, r"outside the flow: \['AP'\]"),
+        ({**RAPID_SUBMISSION, "<110": "Normal V1"}, r"outside the flow: \['<110'\]"),
+        ({**RAPID_SUBMISSION, "Noise artifacts": ["None"]}, "outside the flow"),
+        ({**RAPID_SUBMISSION, "Axis": "Sideways"}, "Invalid choice for Axis"),
+        ({**RAPID_SUBMISSION, "Noise artifacts": ["Noise", "Missing lead", "None"]}, '"None" cannot be selected together'),
+    ],
+)
+def test_validate_answers_rejects_answer_sets_the_flow_cannot_produce(answers, message):
+    with pytest.raises(ValueError, match=message):
+        validate_answers(answers)
+
+
+def test_service_runs_a_full_annotation(tmp_path):
+    ws = SqliteWorksheet(str(tmp_path / "responses.db"))
+    service = AnnotationService("data", lambda: ws, UserStateStore(str(tmp_path / "state.db")), ArrayStore(2**30, 60))
+    opened = service.open_session("annotator")
+    assert opened["shape"][0] == 12 and opened["question"]["key"] == "Noise artifacts"
+    with pytest.raises(ValueError):
+        service.answer(opened["session_id"], "QRS", "Yes")
+    for key, selected in [("Noise artifacts", ["None"]), ("QRS", "No (Asystole)"), ("T", "Normal")]:
+        result = service.answer(opened["session_id"], key, selected)
+    assert result["review"]
+    service.submit(opened["session_id"])
+    assert [r["user_id"] for r in ws.get_all_records()] == ["annotator"]
+    assert service.next_record("annotator") != opened["filename"]
+
+
+def test_service_reloads_evicted_records_and_expires_idle_sessions(tmp_path):
+    store = ArrayStore(2**30, 60)
+    service = AnnotationService("data", lambda: None, UserStateStore(str(tmp_path / "state.db")), store)
+    with pytest.raises(LookupError):
+        service.open_session("annotator", "missing.xml")
+
+    opened = service.open_session("annotator", "batch_10.xml")
+    session_id, key = opened["session_id"], service.sessions[opened["session_id"]]["record_key"]
+    assert service.next_record("annotator") == "batch_9.xml"
+    store.max_bytes = 0
+    store.release(key, session_id)
+    assert key not in store
+    assert len(service.signal(session_id, 0, 10, ["I"])["I"]) == 10
+    assert store.refcount(key) == 1
+
+    service.sessions[session_id]["touched"] -= 61
+    assert service.next_record("annotator") == "batch_10.xml"
+    assert session_id not in service.sessions and store.refcount(key) == 0
+
+
+def annotate(service, session_id):
+    for key, selected in [("Noise artifacts", ["None"]), ("QRS", "No (Asystole)"), ("T", "Normal")]:
+        service.answer(session_id, key, selected)
+
+
+def test_concurrent_submissions_of_one_user_keep_every_file(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    ws = SqliteWorksheet(str(tmp_path / "responses.db"))
+    service = AnnotationService("data", lambda: ws, UserStateStore(str(tmp_path / "state.db")), ArrayStore(2**30, 60))
+    sessions = [service.open_session("annotator", filename)["session_id"] for filename in ["batch_9.xml", "batch_10.xml"]]
+    for session_id in sessions:
+        annotate(service, session_id)
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(service.submit, sessions))
+    [row] = ws.get_all_records()
+    assert sorted(json.loads(row["data"])) == ["batch_10.xml", "batch_9.xml"]
+
+
+def test_signal_rejects_non_numeric_windows(tmp_path):
+    import asyncio
+
+    import tornado.httpclient
+    import tornado.httpserver
+    import tornado.testing
+
+    from ecg_annot.server.api import make_app
+
+    service = AnnotationService("data", lambda: None, UserStateStore(str(tmp_path / "state.db")), ArrayStore(2**30, 60))
+    session_id = service.open_session("annotator")["session_id"]
+
+    async def fetch(query):
+        sock, port = tornado.testing.bind_unused_port()
+        server = tornado.httpserver.HTTPServer(make_app(service))
+        server.add_sockets([sock])
+        try:
+            url = f"http://127.0.0.1:{port}/sessions/{session_id}/signal?{query}"
+            return (await tornado.httpclient.AsyncHTTPClient().fetch(url, raise_error=False)).code
+        finally:
+            server.stop()
+
+    assert asyncio.run(fetch("start=0&stop=10&leads=I")) == 200
+    assert asyncio.run(fetch("start=abc")) == 400
+    assert asyncio.run(fetch("stop=1.5")) == 400
+
+
+def test_new_corpus_files_join_the_worklist_once_the_sync_interval_passes(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(api.time, "monotonic", lambda: now[0])
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "a.xml").write_bytes(b"")
+    scheduler = Scheduler(str(tmp_path / "state.db"), default_scorers())
+    service = AnnotationService(str(corpus), lambda: None, UserStateStore(str(tmp_path / "state.db")), ArrayStore(2**30, 60), scheduler=scheduler)
+    assert service.next_record("u1") == "a.xml"
+
+    (corpus / "0.xml").write_bytes(b"")
+    assert service.next_record("u1") == "a.xml"
+    now[0] += api.CORPUS_SYNC_SECONDS
+    assert service.next_record("u1") == "0.xml"
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys
+from streamlit.testing.v1 import AppTest
+
+heavy = ["pandas", "plotly", "gspread", "google.oauth2", "streamlit_agraph"]
+before = {m for m in heavy if m in sys.modules}
+at = AppTest.from_file("ecg_annot/launch.py", default_timeout=60).run()
+assert not at.exception, at.exception
+print(",".join(m for m in heavy if m in sys.modules and m not in before))
+"""
+
+
+def test_landing_page_does_not_import_heavy_dependencies(tmp_path):
+    env = dict(
+        os.environ,
+        PYTHONPATH=REPO_ROOT,
+        ECG_ANNOT_STATE_DIR=str(tmp_path),
+        ECG_ANNOT_RESPONSE_BACKEND="sqlite",
+        ECG_ANNOT_RESPONSES_DB=str(tmp_path / "responses.db"),
+    )
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
@@ -0,0 +1,90 @@
+import os
+
+from ecg_annot.server import metrics
+from ecg_annot.server.metrics import BUCKETS_S, InstrumentedWorksheet, Registry
+
+
+def test_observations_accumulate_into_inclusive_buckets():
+    registry = Registry(window=2)
+    for seconds in [0.0005, 0.001, 0.003, 0.003, 60.0]:
+        registry.observe("decode", seconds)
+    stats = registry.spans["decode"]
+    assert stats.buckets[0] == 2 and stats.buckets[BUCKETS_S.index(0.005)] == 2 and stats.buckets[-1] == 1
+    assert sum(stats.buckets) == stats.count == 5
+    assert stats.total == 0.0005 + 0.001 + 0.003 + 0.003 + 60.0
+    assert registry.recent("decode") == [0.003, 60.0] and registry.recent("missing") == []
+
+
+def test_counters_accumulate():
+    registry = Registry()
+    registry.inc("shared_cache.hit")
+    registry.inc("shared_cache.hit", 2)
+    registry.inc("shared_cache.evict", 0.5)
+    assert registry.counters == {"shared_cache.hit": 3, "shared_cache.evict": 0.5}
+
+
+def test_openmetrics_text():
+    registry = Registry()
+    registry.observe("sheet.read", 0.002)
+    registry.observe("sheet.read", 0.3)
+    registry.inc("shared_cache.miss")
+    buckets = dict.fromkeys(BUCKETS_S + ["+Inf"], 0)
+    for bound in buckets:
+        buckets[bound] = (bound == "+Inf" or bound >= 0.0025) + (bound == "+Inf" or bound >= 0.5)
+    assert registry.render_openmetrics() == "\n".join([
+        "# TYPE ecg_annot_span_seconds histogram",
+        "# HELP ecg_annot_span_seconds Duration of instrumented hot paths.",
+        *(f'ecg_annot_span_seconds_bucket{{span="sheet.read",le="{bound}"}} {n}' for bound, n in buckets.items()),
+        'ecg_annot_span_seconds_count{span="sheet.read"} 2',
+        'ecg_annot_span_seconds_sum{span="sheet.read"} 0.302',
+        "# TYPE ecg_annot_events counter",
+        'ecg_annot_events_total{name="shared_cache.miss"} 1.0',
+        "# EOF",
+        "",
+    ])
+
+
+def test_span_timed_and_instrumented_worksheet_record_into_the_shared_registry(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, "METRICS", registry)
+
+    class Worksheet:
+        title = "responses"
+
+        def get_all_records(self):
+            return [{"user_id": "u1"}]
+
+    with metrics.span("figure"):
+        pass
+    assert metrics.timed("decode")(lambda x: x * 2)(21) == 42
+    ws = InstrumentedWorksheet(Worksheet(), prefix="sqlite")
+    assert ws.title == "responses" and ws.get_all_records() == [{"user_id": "u1"}]
+    assert {name: stats.count for name, stats in registry.spans.items()} == {"figure": 1, "decode": 1, "sqlite.get_all_records": 1}
+
+
+def test_dump_replaces_the_file_atomically(tmp_path):
+    registry = Registry()
+    registry.inc("upload")
+    path = tmp_path / "metrics" / "app.txt"
+    registry.dump(str(path))
+    registry.inc("upload")
+    registry.dump(str(path))
+    assert path.read_text().endswith('ecg_annot_events_total{name="upload"} 2.0\n# EOF\n')
+    assert os.listdir(path.parent) == ["app.txt"]
+
+
+def test_file_exporter_starts_once(monkeypatch):
+    started = []
+
+    class Thread:
+        def __init__(self, target, name, daemon):
+            started.append(name)
+
+        def start(self):
+            pass
+
+    monkeypatch.setattr(metrics, "_exporter_started", False)
+    monkeypatch.setattr(metrics.threading, "Thread", Thread)
+    metrics.start_file_exporter("metrics-{pid}.txt")
+    metrics.start_file_exporter("metrics-{pid}.txt")
+    assert started == ["metrics-exporter"]
@@ -0,0 +1,59 @@
+import base64
+
+import numpy as np
+import pytest
+
+from ecg_annot.configs.annotation import PTB_ORDER
+from ecg_annot.data_utils.prepare_xml import load_ecg_signals_only
+from ecg_annot.data_utils.records import ArrayRecord, ECGRecord
+
+
+def test_xml_windows_match_full_decode():
+    for path in ["data/batch_9.xml", "data/batch_10.xml"]:
+        full = load_ecg_signals_only(path)
+        record = ECGRecord.from_xml_path(path)
+        assert record.shape == full.shape and record.sample_rate == 250
+        leads = ["aVR", "V3", "III", "I"]
+        rows = [PTB_ORDER.index(lead) for lead in leads]
+        for start, stop in [(0, 1), (1, 2), (3, 1000), (1234, 2500), (2499, 2500), (2000, 9999)]:
+            assert np.array_equal(record.window(leads, start, stop), full[rows, start:stop])
+        assert np.array_equal(np.asarray(record), full)
+
+
+def test_array_record_window_selects_leads_in_order():
+    signals = np.arange(12 * 5, dtype=np.float32).reshape(12, 5)
+    record = ArrayRecord(signals)
+    assert np.array_equal(record.window(["V6", "I"], 1, 3), signals[[11, 0], 1:3])
+    assert record.window(None, 4, 2).shape == (12, 0)
+
+
+def test_ecg_record_keeps_int16_samples_and_indexes_like_an_array():
+    full = load_ecg_signals_only("data/batch_9.xml")
+    record = ECGRecord.from_xml_path("data/batch_9.xml")
+    payload_bytes = record.nbytes
+    assert np.array_equal(record.window(["aVF", "V2"], 10, 20), full[[PTB_ORDER.index("aVF"), PTB_ORDER.index("V2")], 10:20])
+    assert sorted(record._decoded) == ["I", "II", "V2"]
+    assert record.nbytes == payload_bytes - 3 * (len(base64.b64encode(bytes(5000))) - 5000)
+    assert record.samples.dtype == np.int16 and record.nbytes * 2 <= full.nbytes
+    assert record.lead_names == ["I", "II", "V1", "V2", "V3", "V4", "V5", "V6"]
+    assert np.array_equal(record[4], full[4])
+    assert np.array_equal(record[2:6, 100:400:3], full[2:6, 100:400:3])
+    restored = ECGRecord.from_metadata(record.samples, record.metadata())
+    assert np.array_equal(np.asarray(restored), full)
+
+
+def test_xml_missing_leads_fails_both_decoders():
+    xml = b"<RestingECG><Waveform><WaveformType>Rhythm</WaveformType><LeadData><LeadID>V1</LeadID></LeadData></Waveform></RestingECG>"
+    with pytest.raises(RuntimeError, match="both XML types"):
+        ECGRecord.from_xml_bytes(xml, "bad.xml")
+
+
+def test_xml_odd_byte_payload_fails_both_decoders_the_same_way(tmp_path):
+    payload = base64.b64encode(b"\x01\x00\x02").decode("ascii")
+    leads = "".join(f"<LeadData><LeadID>{lead}</LeadID><WaveFormData>{payload}</WaveFormData></LeadData>" for lead in PTB_ORDER)
+    xml = f"<RestingECG><Waveform><WaveformType>Rhythm</WaveformType>{leads}</Waveform></RestingECG>".encode()
+    (tmp_path / "odd.xml").write_bytes(xml)
+    with pytest.raises(RuntimeError, match="both XML types.*not whole int16 samples"):
+        ECGRecord.from_xml_bytes(xml, "odd.xml")
+    with pytest.raises(RuntimeError, match="both XML types.*not whole int16 samples"):
+        load_ecg_signals_only(str(tmp_path / "odd.xml"))
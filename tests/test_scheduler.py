@@ -0,0 +1,58 @@
+import json
+
+from ecg_annot.configs.annotation import ALL_QUESTIONS_GRAPH
+from ecg_annot.server.scheduler import CoverageScorer, DisagreementScorer, ModelProbabilityScorer, RareClassScorer, Scheduler, default_scorers
+
+DURATION = ALL_QUESTIONS_GRAPH["Duration"]["question"]
+T_WAVE = ALL_QUESTIONS_GRAPH["T"]["question"]
+PREEXCITATION = ALL_QUESTIONS_GRAPH["Preexcitation"]["question"]
+
+
+def test_worklist_reorders_as_submissions_land(tmp_path):
+    scheduler = Scheduler(str(tmp_path / "state.db"), [DisagreementScorer(), RareClassScorer()])
+    scheduler.add_files(["a.xml", "b.xml", "c.xml"])
+    assert scheduler.next_record() == "a.xml"
+
+    scheduler.record_submission("u1", "b.xml", {DURATION: "<110", T_WAVE: "Normal"})
+    scheduler.record_submission("u2", "b.xml", {DURATION: ">120", T_WAVE: "Normal"})
+    scheduler.record_submission("u1", "c.xml", {PREEXCITATION: "Yes", T_WAVE: "Normal"})
+    assert [row["filename"] for row in scheduler.top()] == ["c.xml", "b.xml", "a.xml"]
+    assert scheduler.next_record(exclude=["c.xml"]) == "b.xml"
+    assert scheduler.next_record(candidates=["a.xml"]) == "a.xml"
+
+    scheduler.record_submission("u2", "b.xml", {DURATION: "<110", T_WAVE: "Normal"})
+    assert scheduler.top()[1]["filename"] == "a.xml"
+
+
+def test_model_scores_rank_unannotated_files(tmp_path):
+    scores = tmp_path / "scores.csv"
+    scores.write_text("filename,normal,abnormal\na.xml,0.99,0.01\nb.xml,0.5,0.5\n")
+    scheduler = Scheduler(str(tmp_path / "state.db"), [ModelProbabilityScorer(str(scores))])
+    scheduler.add_files(["a.xml", "b.xml"])
+    assert scheduler.next_record() == "b.xml"
+
+    scheduler.backfill([{"user_id": "u1", "data": json.dumps({"z.xml": {T_WAVE: "Normal"}})}])
+    assert {row["filename"] for row in scheduler.top()} == {"a.xml", "b.xml", "z.xml"}
+
+
+def test_pending_files_outrank_agreed_ones(tmp_path):
+    scheduler = Scheduler(str(tmp_path / "state.db"), default_scorers())
+    scheduler.add_files(["a.xml", "b.xml"])
+    scheduler.record_submission("u1", "a.xml", {DURATION: "<110", T_WAVE: "Normal"})
+    scheduler.record_submission("u2", "a.xml", {DURATION: "<110", T_WAVE: "Normal"})
+    assert scheduler.next_record() == "b.xml"
+    assert scheduler.top()[0]["coverage"] == 1.0
+    assert CoverageScorer(target=2).score("c.xml", [{}]) == 0.5
+
+
+def test_candidates_filter_the_worklist_and_own_submissions_are_skipped(tmp_path):
+    scheduler = Scheduler(str(tmp_path / "state.db"), default_scorers())
+    scheduler.add_files(["a.xml"])
+    scheduler.record_submission("u1", "a.xml", {DURATION: "<110", T_WAVE: "Normal"})
+    assert scheduler.next_record(candidates=["a.xml"], user_id="u1") is None
+    assert scheduler.next_record(candidates=["a.xml", "new.xml"], user_id="u1") is None
+    scheduler.add_files(["new.xml"])
+    assert scheduler.next_record(candidates=["a.xml", "new.xml"], user_id="u1") == "new.xml"
+    assert scheduler.next_record(candidates=["a.xml", "new.xml"], user_id="u2") == "new.xml"
+    assert scheduler.next_record(exclude=["new.xml"], candidates=["a.xml", "new.xml"], user_id="u2") == "a.xml"
+    assert scheduler.next_record(candidates=["a.xml"], user_id="u2") == "a.xml"
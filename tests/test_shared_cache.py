@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+
+from ecg_annot.server.shared_cache import SharedCache
+
+
+def test_hit_miss_and_atomic_write(tmp_path):
+    cache = SharedCache(str(tmp_path))
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return np.arange(6, dtype=np.int16).reshape(2, 3)
+
+    assert cache.get_array("abcd") is None
+    first = cache.array("abcd", loader)
+    second = cache.array("abcd", loader)
+    assert len(calls) == 1 and isinstance(second, np.memmap) and np.array_equal(first, second)
+    assert cache.blob("ef01", lambda: b"png") == b"png" and cache.blob("ef01", lambda: b"other") == b"png"
+
+    with pytest.raises(TypeError):
+        cache.put_bytes("9999", 123)
+    assert cache.get_bytes("9999") is None
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith(".tmp")]
+
+
+def test_least_recently_used_files_are_evicted_past_the_budget(tmp_path):
+    cache = SharedCache(str(tmp_path), max_bytes=250)
+    cache.put_bytes("aa01", b"a" * 100)
+    cache.put_bytes("bb01", b"b" * 100)
+    os.utime(cache._path("aa01", ".bin"), (1000, 1000))
+    os.utime(cache._path("bb01", ".bin"), (2000, 2000))
+    assert cache.get_bytes("aa01") is not None
+
+    cache.put_bytes("cc01", b"c" * 100)
+    assert cache.get_bytes("bb01") is None
+    assert cache.get_bytes("aa01") is not None and cache.get_bytes("cc01") is not None
+
+    cache.put_bytes("dd01", b"d" * 300)
+    assert cache.get_bytes("dd01") is not None
+    assert SharedCache(str(tmp_path), max_bytes=250)._bytes == 300
@@ -0,0 +1,76 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from ecg_annot.server.array_store import ArrayStore
+from ecg_annot.server.upload_queue import discard_upload, pop_ready, submit_upload
+
+
+def decode(key, filename, file_bytes):
+    if filename.startswith("bad"):
+        raise ValueError("not an ECG")
+    return np.frombuffer(file_bytes, dtype=np.uint8).copy()
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_queue_is_served_in_order_skipping_failed_decodes(tmp_path, pool):
+    store = ArrayStore(max_bytes=1000, holder_ttl=60)
+    spool = str(tmp_path / "uploads")
+    queue = [submit_upload(pool, store, spool, name, name.encode(), decode, 3600) for name in ["a.xml", "bad.xml", "b.xml"]]
+    held, errors = [], []
+
+    def hold(key, loader):
+        held.append(key)
+        return store.acquire(key, "session", loader)
+
+    assert pop_ready(queue, errors, hold, decode)["filename"] == "a.xml"
+    assert errors == [] and [job["filename"] for job in queue] == ["bad.xml", "b.xml"]
+    assert pop_ready(queue, errors, hold, decode)["filename"] == "b.xml"
+    assert errors == ["bad.xml: not an ECG"] and queue == []
+    assert pop_ready(queue, errors, hold, decode) is None
+    assert len(held) == 2 and os.listdir(spool) == []
+
+
+def test_evicted_upload_is_decoded_again_from_the_spool(tmp_path, pool):
+    store = ArrayStore(max_bytes=0, holder_ttl=60)
+    job = submit_upload(pool, store, str(tmp_path), "a.xml", b"abc", decode, 3600)
+    job["future"].result()
+    assert job["key"] not in store
+    errors = []
+    pop_ready([job], errors, lambda key, loader: store.acquire(key, "session", loader), decode)
+    assert errors == [] and bytes(store.get(job["key"], "session")) == b"abc"
+
+
+def test_discarded_upload_is_cancelled_and_unspooled(tmp_path):
+    gate = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(gate.wait)
+        job = submit_upload(pool, ArrayStore(1000, 60), str(tmp_path), "a.xml", b"abc", decode, 3600)
+        discard_upload(job)
+        gate.set()
+    assert job["future"].cancelled() and os.listdir(tmp_path) == []
+    errors = []
+    assert pop_ready([job], errors, lambda key, loader: loader(), decode) is None
+    assert len(errors) == 1 and errors[0].startswith("a.xml")
+
+
+def test_spool_sweep_keeps_files_of_jobs_still_queued(tmp_path, pool):
+    store = ArrayStore(max_bytes=1000, holder_ttl=60)
+    spool = str(tmp_path / "uploads")
+    queue = [submit_upload(pool, store, spool, name, name.encode(), decode, 3600) for name in ["a.xml", "b.xml"]]
+    for job in queue:
+        job["future"].result()
+        os.utime(job["path"], (0, 0))
+    waiting = queue[1]["path"]
+
+    assert pop_ready(queue, [], lambda key, loader: store.acquire(key, "session", loader), decode)["filename"] == "a.xml"
+    discard_upload(submit_upload(pool, store, spool, "c.xml", b"c.xml", decode, 3600))
+    assert os.listdir(spool) == [os.path.basename(waiting)]
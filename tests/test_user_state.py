@@ -0,0 +1,17 @@
+from ecg_annot.server.user_state import UserStateStore
+
+
+def test_completed_files_are_kept_per_user_in_order(tmp_path):
+    path = str(tmp_path / "state.db")
+    store = UserStateStore(path)
+    store.add_completed_file("u1", "b.xml")
+    store.add_completed_file("u1", "a.xml")
+    store.add_completed_file("u1", "b.xml")
+    store.add_completed_file("u2", "c.xml")
+    assert UserStateStore(path).completed_files("u1") == ["b.xml", "a.xml"]
+
+    store.clear_completed_files("u1")
+    assert store.completed_files("u1") == [] and store.completed_files("u2") == ["c.xml"]
+
+    store.clear_all_completed_files()
+    assert store.completed_files("u2") == []
@@ -0,0 +1,47 @@
+import json
+
+from ecg_annot.configs.annotation import ALL_QUESTIONS_GRAPH
+from ecg_annot.server.validate import summarize, validate_records
+
+COMPLETE = {
+    "Noise artifacts": ["Noise"],
+    "Noise leads": ["V1"],
+    "QRS": "Yes",
+    "Pacing": "No",
+    "Axis": "normal",
+    "Lead reversal": "No",
+    "Rate": "Normal",
+    "Amplitude": "Normal",
+    "Preexcitation": "No",
+    "Duration": ">120",
+    ">120": "RBBB",
+    "T": "Normal",
+}
+
+
+def stored(answers):
+    return {ALL_QUESTIONS_GRAPH[key]["question"] if key in ALL_QUESTIONS_GRAPH else key: value for key, value in answers.items()}
+
+
+def test_flags_answers_the_flow_could_not_produce():
+    asystole = {"Noise artifacts": ["None"], "QRS": "No (Asystole)", "T": "Normal"}
+    inconsistent = dict(COMPLETE, **{"Noise artifacts": ["None"], "Noise leads": ["V7"], "AP": "Normal", "<110": "Normal V1", "Extra": 1})
+    del inconsistent["T"]
+    records = [
+        {"user_id": 1, "data": json.dumps({"ok.xml": {**stored(COMPLETE), "updated_at": "2024-01-01T00:00:00"}, "asystole.xml": stored(asystole)})},
+        {"user_id": "u2", "data": json.dumps({"bad.xml": stored(inconsistent)})},
+        {"user_id": "u3", "data": ""},
+    ]
+    issues = validate_records(records)
+    assert set(issues["filename"]) == {"bad.xml"}
+    found = {(row.issue, row.question): row.detail for row in issues.itertuples()}
+    assert found == {
+        ("unknown_question", "Extra"): "not in ALL_QUESTIONS_GRAPH",
+        ("invalid_choice", "Noise leads"): "not one of the choices: V7",
+        ("unexpected_answer", "Noise leads"): 'Noise artifacts is "None"',
+        ("unexpected_answer", "AP"): "Preexcitation is No",
+        ("unexpected_answer", "<110"): "Duration is not <110",
+        ("missing_answer", "T"): "not answered",
+    }
+    assert summarize(issues) == {"unknown_question": 1, "invalid_choice": 1, "unexpected_answer": 3, "missing_answer": 1}
+    assert validate_records([]).empty